@@ -1,8 +1,24 @@
 from system import EXPORT_DIR
-import win32com.client
+from pathlib import Path
+import backend
+import tempfile
+import time
 import os
 
 
+# answers No to 'Save changes?' when the current drawing is modified,
+# AutoLISP strings need forward slashes
+OPEN_COMMAND = ('(if (/= 0 (getvar "DBMOD")) (command "_.OPEN" "_N" "{0}") '
+                '(command "_.OPEN" "{0}"))\n')
+
+EXPORT_COMMANDS = {
+    'pdf': '-EXPORT PDF E NO {}\n',
+    'dwf': '-EXPORT DWF E NO {}\n',
+    'dxf': 'DXFOUT\n{}\n16 ',
+    'dwg': 'SAVE\n{}\n'
+}
+
+
 def application(visible=True):
     """Autcoad Application COM Object
 
@@ -20,13 +36,13 @@ def application(visible=True):
     obj
         Autocad Application COM Object
     """
-
+    import win32com.client
     app = win32com.client.Dispatch('AutoCAD.Application')
     app.Visible = visible
     return app
 
 
-class Document:
+class Document(backend.Document):
     """Document
 
     The Document base class contains methods and properties for Autocad's
@@ -62,12 +78,6 @@ class Document:
         self.export_dir = export_dir
         self.path = path
 
-
-    @property
-    def partcode(self):
-        """str: return the file's partcode from it's full path"""
-        return self.path.stem
-
     def export_to_pdf(self, subdir):
         """Export dwg file to pdf
 
@@ -129,18 +139,22 @@ class Document:
         subdir: str
             Sub directory for exported file.
         filetype: str
-            Inventor supported file format
+            export file format, or a list of them to export each from this
+            one open
+
+        Returns
+        -------
+        Path : obj
+            Path object of the exported file, a list of them for a list of
+            file formats
         """
+        if not isinstance(filetype, str):
+            return [self.export_to(subdir, f) for f in filetype]
         file = self.partcode + '.' + filetype
         path = self.export_dir.joinpath(subdir).joinpath(file)
 
-        command = {
-            'pdf': '-EXPORT PDF E NO {}\n',
-            'dwf': '-EXPORT DWF E NO {}\n',
-            'dxf': 'DXFOUT\n{}\n16 ',
-            'dwg': 'SAVE\n{}\n'
-        }
-        self.doc.SendCommand(command[filetype].format(str(path)))
+        self.doc.SendCommand(EXPORT_COMMANDS[filetype].format(str(path)))
+        return path
 
     def close(self):
         """Close Document
@@ -157,3 +171,136 @@ class Document:
 
 class Drawing(Document):
     pass
+
+
+def export_script(paths, outputs, filetype='pdf'):
+    """AutoCAD script for exporting many drawings
+
+    One script opens each dwg in turn and exports it, so the whole list
+    runs as a single command stream in one session. SDI is switched on
+    for the duration of the script so that each OPEN replaces the current
+    drawing and the script carries on in it, with no throw-away file.
+    Exporting leaves a drawing marked as modified, which makes the next
+    OPEN ask whether to save it, so each OPEN is wrapped in an AutoLISP
+    check of DBMOD that answers No when the question will be asked.
+
+    Parameters
+    ----------
+    paths : :obj:`list` of obj
+        Path objects of the dwg files
+    outputs : :obj:`list` of obj
+        Path objects of the exported files, one per dwg
+    filetype : str
+        export file format ('pdf', 'dwf', 'dxf' or 'dwg')
+
+    Returns
+    -------
+    str
+        script text
+    """
+    lines = ['FILEDIA 0\n', 'SDI 1\n']
+    for path, output in zip(paths, outputs):
+        lines.append(OPEN_COMMAND.format(Path(path).as_posix()))
+        lines.append(EXPORT_COMMANDS[filetype].format('"{}"'.format(output)))
+    lines += ['SDI 0\n', 'FILEDIA 1\n']
+    return ''.join(lines)
+
+
+class ScriptSink:
+    """Script Sink
+
+    Run a script in the active AutoCAD document by saving it to a
+    temporary '.scr' file and sending one SCRIPT command. AutoCAD reads
+    the file while the script runs, so the files are only removed by
+    'close()', once the script has finished.
+
+    Parameters
+    ----------
+    app : obj
+        AutoCAD Application COM Object
+
+    Attributes
+    ----------
+    paths : :obj:`list` of :obj:`str`
+        script files written and not removed yet
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.paths = []
+
+    def __call__(self, script):
+        fd, path = tempfile.mkstemp(suffix='.scr')
+        with os.fdopen(fd, 'w') as file:
+            file.write(script)
+        self.paths.append(path)
+        self.app.ActiveDocument.SendCommand('_.SCRIPT "{}"\n'.format(path))
+
+    def close(self):
+        """Remove the script files"""
+        for path in self.paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.paths = []
+
+
+def batch_export(paths, subdir, app=None, filetype='pdf',
+                 export_dir=EXPORT_DIR, sink=None, timeout=600):
+    """Export a list of drawings with one script
+
+    Files left at the output paths by an earlier run are removed before
+    the script is run, so only files this script writes count as
+    exported.
+
+    Parameters
+    ----------
+    paths : :obj:`list` of obj
+        Path objects of the dwg files
+    subdir : str
+        Sub directory for exported files.
+    app : obj
+        AutoCAD Application COM Object, used when no sink is given
+    filetype : str
+        export file format ('pdf', 'dwf', 'dxf' or 'dwg')
+    export_dir : obj
+        Export directory location
+    sink : function
+        called with the script text to run it. Defaults to
+        'ScriptSink(app)'.
+    timeout : float
+        seconds to wait for the next exported file to appear. The wait
+        starts again whenever one appears, so a long batch is not cut
+        short while AutoCAD is still working through it.
+
+    Returns
+    -------
+    outputs : :obj:`list` of obj
+        Path objects of the exported files, one per dwg
+    missing : :obj:`list` of obj
+        Path objects of the exported files that never appeared
+    """
+    outputs = [
+        export_dir.joinpath(subdir).joinpath(Path(path).stem + '.' + filetype)
+        for path in paths
+    ]
+    for output in outputs:
+        if output.exists():
+            os.remove(str(output))
+    script_sink = ScriptSink(app) if sink is None else sink
+    try:
+        script_sink(export_script(paths, outputs, filetype))
+
+        deadline = time.time() + timeout
+        missing = [output for output in outputs if not output.exists()]
+        while missing and time.time() < deadline:
+            time.sleep(1)
+            waiting = [output for output in missing if not output.exists()]
+            if len(waiting) < len(missing):
+                deadline = time.time() + timeout
+            missing = waiting
+    finally:
+        if sink is None:
+            script_sink.close()
+    return outputs, missing
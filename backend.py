@@ -0,0 +1,190 @@
+"""
+CAD Backends
+
+The core program talks to Inventor and AutoCAD through the modules
+returned by 'inventor()' and 'autocad()'. 'use("fake")' swaps them for
+fake.py and fake_autocad.py, which simulate the COM latency and write
+placeholder files, so the whole pipeline can run on any machine.
+"""
+
+import importlib
+
+
+BACKENDS = {
+    'inventor': ('inventor', 'autocad'),
+    'fake': ('fake', 'fake_autocad'),
+}
+
+DEFAULT = 'inventor'
+
+_current = DEFAULT
+
+
+class Document:
+    """Document interface
+
+    Base class of the document classes in every backend. An Inventor
+    backend module provides 'application(silent, visible, new_instance)',
+    'process_id(app)' and the 'Drawing', 'Assembly' and 'Part' classes.
+    An AutoCAD backend module provides 'application(visible)', 'Drawing'
+    and 'batch_export(paths, subdir, app)'. Documents are opened by
+    '(path, app, export_dir)'.
+
+    Attributes
+    ----------
+    path : obj
+        Path object from python pathlib module
+    source : obj
+        Path object of the workspace file the document stands for. Same
+        as 'path' unless it was opened from a staged copy, and used to
+        key the drawing info cache.
+    app : obj
+        Application object of the backend
+    export_dir : obj
+        Export directory location
+    """
+
+    @property
+    def partcode(self):
+        """str: return the file's partcode from it's full path"""
+        return self.path.stem
+
+    def export_to(self, subdir, filetype='pdf'):
+        """Export the document, return the Path object of the file written
+
+        A list of file types exports each of them from this one open and
+        returns a list of Path objects.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Close the document without saving"""
+        raise NotImplementedError
+
+
+class Drawing(Document):
+    """Drawing interface"""
+
+    def get_drawing_info(self):
+        """Return a dictionary of the drawing's properties"""
+        raise NotImplementedError
+
+    def export_part_list(self, filetype='xlsx'):
+        """Export the part list, return the Path object of the file written"""
+        raise NotImplementedError
+
+
+class Assembly(Document):
+    """Assembly interface"""
+
+    def export_bom(self, filetype='xlsx'):
+        """Export the bom, return the Path object of the file written"""
+        raise NotImplementedError
+
+
+class Session:
+    """Inventor Session
+
+    One Inventor Application COM Object shared by every job in a run,
+    started on first use. Jobs are given the session as their 'app' and
+    resolve it with 'application(app)' only once they open a document, so
+    a job that never opens one never starts Inventor. The application is
+    started again if a job selects another backend.
+
+    Parameters
+    ----------
+    name : str
+        backend each job runs on unless it selects one, DEFAULT if not
+        given
+
+    Attributes
+    ----------
+    backend : str
+        backend each job runs on unless it selects one
+    """
+
+    def __init__(self, name=None):
+        self.backend = name or DEFAULT
+        self._app = None
+        self._app_backend = None
+
+    @property
+    def app(self):
+        """obj: Inventor Application COM Object of the selected backend"""
+        if self._app is None or self._app_backend != _current:
+            self._app = inventor().application()
+            self._app_backend = _current
+        return self._app
+
+    def reset(self):
+        """Reconnect to Inventor on the next use"""
+        self._app = None
+
+
+def application(app=None):
+    """Inventor Application COM Object to open documents in
+
+    Parameters
+    ----------
+    app : obj
+        Application object, a Session, or None to start one
+
+    Returns
+    -------
+    obj
+        Application object of the selected backend
+    """
+    if isinstance(app, Session):
+        return app.app
+    if app is None:
+        return inventor().application()
+    return app
+
+
+def use(name):
+    """Select the CAD backend used by the core program
+
+    Parameters
+    ----------
+    name : str
+        backend name ('inventor' or 'fake')
+    """
+    global _current
+    if name not in BACKENDS:
+        raise ValueError('Unknown backend ' + repr(name))
+    _current = name
+
+
+def current():
+    """str: name of the selected backend"""
+    return _current
+
+
+def load(name=None):
+    """Load the Inventor side of a CAD backend
+
+    Parameters
+    ----------
+    name : str
+        backend name ('inventor' or 'fake'), the selected one if not given
+
+    Returns
+    -------
+    obj
+        backend module
+    """
+    if name is None:
+        name = _current
+    if name not in BACKENDS:
+        raise ValueError('Unknown backend ' + repr(name))
+    return importlib.import_module(BACKENDS[name][0])
+
+
+def inventor():
+    """obj: Inventor module of the selected backend"""
+    return load(_current)
+
+
+def autocad():
+    """obj: AutoCAD module of the selected backend"""
+    return importlib.import_module(BACKENDS[_current][1])
@@ -0,0 +1,286 @@
+"""
+Benchmarks
+
+Run with 'python benchmark.py'. Each benchmark prints its timings, they do
+not need Inventor or AutoCAD.
+"""
+
+import subprocess
+import timeit
+import sys
+import os
+
+
+def _drawing_info(i):
+    return {
+        'partcode': 'AGR{:04d}-{:03d}-00'.format(i // 1000, i % 1000),
+        'rev': i % 10,
+        'desc': 'Part ' + str(i),
+        'material': 'Mild Steel',
+        'finish': 'Galvanised',
+        'size': ['A0', 'A1', 'A3'][i % 3],
+    }
+
+
+def bench_drawing_info_rows(rows=10000):
+    """Drawing info accumulation
+
+    Compare growing the drawing_info DataFrame one row at a time (what
+    'DataFrame.append' did, here with 'pd.concat') against collecting
+    the rows in a list and building the DataFrame once.
+    """
+    import pandas as pd
+    from core import DRAWING_INFO_COLUMNS
+
+    infos = [_drawing_info(i) for i in range(rows)]
+
+    def per_row():
+        rs = pd.DataFrame(columns=DRAWING_INFO_COLUMNS)
+        for info in infos:
+            rs = pd.concat([rs, pd.DataFrame([info])], ignore_index=True)
+        return rs
+
+    def row_buffer():
+        records = []
+        for info in infos:
+            records.append(info)
+        return pd.DataFrame(records, columns=DRAWING_INFO_COLUMNS)
+
+    t1 = timeit.timeit(per_row, number=1)
+    t2 = min(timeit.repeat(row_buffer, number=1, repeat=5))
+    print('drawing info, {} rows'.format(rows))
+    print('    per row append : {:8.3f} s'.format(t1))
+    print('    row buffer     : {:8.3f} s  ({:.0f}x)'.format(t2, t1 / t2))
+
+
+def bench_start_inventor(documents=1000, processes=300, latency=0.0):
+    """Inventor liveness check
+
+    Time 'start_inventor()' once per document open against a stubbed
+    process table of 'processes' entries, checking the table every call
+    (the old behaviour) and with the cached session state. 'latency'
+    seconds are added to each stubbed 'tasklist' to stand in for the
+    subprocess.
+    """
+    import system
+    import time
+
+    table = '\n'.join(
+        'process{}.exe {} Console 1 10,000 K'.format(i, i)
+        for i in range(processes))
+    table += '\nInventor.exe 9999 Console 1 900,000 K'
+    tasklist = system._tasklist
+
+    def stub():
+        if latency:
+            time.sleep(latency)
+        return table
+
+    system._tasklist = stub
+
+    def every_call():
+        for _ in range(documents):
+            system.is_inventor_running()
+
+    def cached():
+        system.inventor_failed()
+        for _ in range(documents):
+            system.start_inventor()
+
+    try:
+        t1 = min(timeit.repeat(every_call, number=1, repeat=5))
+        t2 = min(timeit.repeat(cached, number=1, repeat=5))
+    finally:
+        system._tasklist = tasklist
+        system.inventor_failed()
+    print('start_inventor, {} documents'.format(documents))
+    print('    check every call : {:8.4f} s'.format(t1))
+    print('    cached session   : {:8.4f} s  ({:.0f}x)'.format(t2, t1 / t2))
+
+
+def bench_import_time(module='main', top=10):
+    """Startup import time
+
+    Import 'module' in a fresh interpreter with '-X importtime' and print
+    the total and the slowest imports by cumulative time.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        cwd=here, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.strip()))
+    total = max(us for us, name in rows if name == module)
+    print('import {}: {:8.1f} ms'.format(module, total / 1000))
+    for us, name in sorted(rows, reverse=True)[:top]:
+        print('    {:8.1f} ms  {}'.format(us / 1000, name))
+
+
+def bench_intermediates(sizes=(500, 5000), repeat=3):
+    """Stage-to-stage table round trip
+
+    Write and read back a bom-like table of each size in every available
+    format: xlsx (the old intermediates), csv and, with pyarrow installed,
+    parquet.
+    """
+    import pandas as pd
+    import tempfile
+    from pathlib import Path
+
+    formats = {
+        'xlsx': (lambda df, p: df.to_excel(p, index=False), pd.read_excel),
+        'csv': (lambda df, p: df.to_csv(p, index=False), pd.read_csv),
+    }
+    try:
+        import pyarrow  # noqa: F401
+        formats['parquet'] = (
+            lambda df, p: df.to_parquet(p, index=False), pd.read_parquet)
+    except ImportError:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            df = pd.DataFrame([_drawing_info(i) for i in range(size)])
+            df['Part Number'] = df['partcode']
+            df['QTY'] = 1
+            print('intermediate round trip, {} rows'.format(size))
+            for fmt, (write, read) in formats.items():
+                path = str(Path(tmp).joinpath('bom.' + fmt))
+
+                def round_trip():
+                    write(df, path)
+                    return read(path)
+
+                t = min(timeit.repeat(round_trip, number=1, repeat=repeat))
+                print('    {:8s}: {:8.3f} s'.format(fmt, t))
+
+
+def _workspace(root, parts):
+    """Synthetic workspace for the fake backend
+
+    One top level assembly 'AGR9000-000-00' whose placeholder iam lists
+    'parts' children. Every tenth child is a sub-assembly and every
+    fiftieth is an AutoCAD dwg instead of an Inventor drawing.
+    """
+    def touch(partcode, filetype, text=''):
+        directory = root.joinpath('client', partcode[0:7], partcode[8:11])
+        os.makedirs(str(directory), exist_ok=True)
+        with open(str(directory.joinpath(partcode + '.' + filetype)), 'w') as f:
+            f.write(text)
+
+    assembly = 'AGR9000-000-00'
+    children = [
+        'AGR9001-{:03d}-{:02d}'.format(i // 100, i % 100) for i in range(parts)]
+    touch(assembly, 'iam', ''.join(child + '\n' for child in children))
+    touch(assembly, 'idw')
+    for i, partcode in enumerate(children):
+        if i % 50 == 49:
+            touch(partcode, 'dwg')
+            continue
+        touch(partcode, 'ipt')
+        touch(partcode, 'idw')
+        if i % 10 == 9:
+            touch(partcode, 'iam')
+    return assembly
+
+
+def bench_pipeline(sizes=(10, 1000, 10000), latency=0.0):
+    """End-to-end batch export
+
+    Run 'core.batch_export' on the fake backend against a synthetic
+    workspace of each size, once from scratch and once more with nothing
+    changed. 'latency' seconds are slept for every fake open, export and
+    close.
+    """
+    import tempfile
+    from pathlib import Path
+    import backend
+    import manifest
+    import system
+    import fake
+    import core
+
+    saved = {name: getattr(system, name) for name in (
+        'INVENTOR_DIR', 'EXPORT_DIR', 'INDEX_PATH', 'INFO_CACHE_PATH',
+        'STAGING_DIR')}
+    latencies = (fake.OPEN_LATENCY, fake.EXPORT_LATENCY, fake.CLOSE_LATENCY)
+    current = backend.current()
+    fake.OPEN_LATENCY = fake.EXPORT_LATENCY = fake.CLOSE_LATENCY = latency
+    backend.use('fake')
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                system.INVENTOR_DIR = Path(tmp).joinpath('workspace')
+                system.EXPORT_DIR = Path(tmp).joinpath('export')
+                system.INDEX_PATH = system.EXPORT_DIR.joinpath('index.json')
+                system.INFO_CACHE_PATH = system.EXPORT_DIR.joinpath('cache.json')
+                system.STAGING_DIR = Path(tmp).joinpath('staging')
+                system._index = None
+                system._staging = None
+                manifest._info_cache = None
+                assembly = _workspace(system.INVENTOR_DIR, size)
+                app = fake.application()
+
+                def run():
+                    core.batch_export(assembly, app=app, report=False,
+                                      print_sets=False)
+
+                print('batch export, {} parts'.format(size))
+                for label in ('first run', 'unchanged'):
+                    t = timeit.timeit(run, number=1)
+                    print('    {:9s}: {:8.3f} s  {:8.0f} parts/s'.format(
+                        label, t, size / t))
+    finally:
+        for name, value in saved.items():
+            setattr(system, name, value)
+        system._index = None
+        system._staging = None
+        manifest._info_cache = None
+        fake.OPEN_LATENCY, fake.EXPORT_LATENCY, fake.CLOSE_LATENCY = latencies
+        backend.use(current)
+
+
+def bench_timing_overhead(calls=100000):
+    """Stage timer overhead
+
+    Time an empty 'with timing.stage(...)' block with timing disabled and
+    enabled, against an empty loop.
+    """
+    import timing
+
+    def bare():
+        for _ in range(calls):
+            pass
+
+    def timed():
+        for _ in range(calls):
+            with timing.stage('stage', 'AGR0000-000-00'):
+                pass
+
+    enabled = timing.ENABLED
+    try:
+        t0 = min(timeit.repeat(bare, number=1, repeat=5))
+        timing.enable(False)
+        t1 = min(timeit.repeat(timed, number=1, repeat=5))
+        timing.enable()
+        t2 = min(timeit.repeat(timed, number=1, repeat=5))
+    finally:
+        timing.enable(enabled)
+        timing.reset()
+    print('timing.stage, {} calls'.format(calls))
+    for label, t in (('disabled', t1), ('enabled', t2)):
+        print('    {:8s} : {:8.3f} us per call'.format(
+            label, (t - t0) / calls * 1e6))
+
+
+if __name__ == '__main__':
+    bench_drawing_info_rows()
+    bench_start_inventor()
+    bench_import_time()
+    bench_intermediates()
+    bench_pipeline()
+    bench_timing_overhead()
@@ -0,0 +1,83 @@
+"""
+BOM Walker
+"""
+
+import store
+
+
+def exported_children(directory):
+    """Children listed in an exported part list and bom
+
+    Parameters
+    ----------
+    directory : obj
+        Path object of the assembly's export folder, holding the part_list
+        and bom tables exported from Inventor
+
+    Returns
+    -------
+    partcodes : :obj:`list` of :obj:`str`
+        partcodes in part list order, then bom order, without duplicates.
+        None if neither table has been exported.
+    """
+    partcodes = []
+    found = False
+    for name, column in (('part_list', 'Dwg_No'), ('bom', 'Part Number')):
+        if store.find(directory, name) is None:
+            continue
+        found = True
+        df = store.read(directory, name, store.INVENTOR_ENCODING)
+        partcodes += [str(p) for p in df.loc[df[column].notnull(), column]]
+    if not found:
+        return None
+    return list(dict.fromkeys(partcodes))
+
+
+def walk(root, children, is_assembly, memo=None):
+    """Expand a multi-level BOM
+
+    Walk the assembly tree depth first. Each sub-assembly is expanded
+    once, however many times it is used, and every partcode appears once
+    in the result, after all of its own children.
+
+    Parameters
+    ----------
+    root : str
+        AGR assembly number usually in 'AGR0000-000-00' format
+    children : function
+        'children(assembly)' returns the partcodes directly under an assembly
+    is_assembly : function
+        'is_assembly(partcode)' returns True if the partcode should be
+        expanded
+    memo : dict
+        assembly -> children, shared between walks to reuse expansions
+
+    Returns
+    -------
+    partcodes : :obj:`list` of :obj:`str`
+        every partcode under the root, children before their parents, the
+        root itself excluded
+    """
+    if memo is None:
+        memo = {}
+    order = []
+    state = {}
+
+    def visit(partcode):
+        if state.get(partcode) == 'done':
+            return
+        if state.get(partcode) == 'visiting':
+            print('Warning - ' + partcode + ' contains itself, skipped')
+            return
+        state[partcode] = 'visiting'
+        if partcode == root or is_assembly(partcode):
+            if partcode not in memo:
+                memo[partcode] = children(partcode)
+            for child in memo[partcode]:
+                visit(child)
+        state[partcode] = 'done'
+        if partcode != root:
+            order.append(partcode)
+
+    visit(root)
+    return order
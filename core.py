@@ -1,28 +1,51 @@
 """
 Core Program
+
+pandas and the CAD modules (which load win32com) are imported inside the
+functions that use them, so starting the menu or a single export stays fast.
+The CAD modules come from the backend selected in backend.py.
 """
 
-import inventor
-import autocad
 import system
+import store
+import pool
+import bom
+import timing
+import printset
+import backend as backends
+from manifest import Manifest, info_cache
+from journal import Journal
+from staging import Prefetcher
+from pathlib import Path
 
-import pandas as pd
 import zipfile
 import os
 
 
-def process_assembly(assembly, app):
+DRAWING_INFO_COLUMNS = ['partcode', 'rev', 'desc', 'material', 'finish', 'size']
+
+# file formats exported from the part (ipt) instead of the drawing (idw)
+IPT_CONVERT = [
+    'CATPart', 'jt', 'ipt', 'igs', 'iges', 'sat',
+    'smt', 'stl', 'step', 'stp', 'xgl', 'zgl'
+]
+
+# drawings exported between manifest saves
+MANIFEST_SAVE_EVERY = 20
+
+
+def process_assembly(assembly, app, paths=None):
     """Process Assembly
 
     Assembly must be an Inventor file and have pick list on the first page.
 
-    1) Open assembly drawing (ipt)
+    1) Open assembly drawing (idw)
     2) Pull drawing info to dict
-    3) Save to spreadsheet - drawing_info.xlsx
-    4) Export print, pdf and dxf files
-    5) Save to spreadsheet - part_list.xlsx
+    3) Export print, pdf and dxf files
+    4) Save part list - part_list.csv
+    5) Save drawing info
     6) Open assembly part (iam)
-    7) Save spreadsheet - bom.xlsx
+    7) Save bom - bom.csv
 
     Parameters
     ----------
@@ -30,40 +53,122 @@ def process_assembly(assembly, app):
         AGR part number usually in 'AGR0000-000-00' format
     app : obj
         Inventor Application COM Object
+    paths : dict
+        partcode -> {filetype: path} resolved by a saved plan, see plan.py
     """
+    inventor = backends.inventor()
 
-    # 1) Open assembly drawing (ipt)
-    path = system.find_path(assembly, 'idw')
-    idw = inventor.Drawing(path, app)
+    manifest = _load_manifest(assembly)
+    journal = _load_journal(assembly)
+    journal.clear()
 
-    # 2) Pull drawing info to dict
-    rs = pd.DataFrame(columns=['partcode', 'rev', 'desc', 'material', 'finish', 'size'])
-    drawing_info = idw.get_drawing_info()
-    rs = rs.append(drawing_info, ignore_index=True)
+    # 1) Open assembly drawing (idw), unless unchanged since the last run
+    idw_path = _find_path(assembly, 'idw', paths)
+    references = _references(idw_path)
+    if manifest.is_fresh(idw_path, references):
+        drawing_info = manifest.drawing_info(idw_path)
+        outputs = manifest.outputs(idw_path)
+    else:
+        with timing.stage('open', assembly):
+            idw = inventor.Drawing(idw_path, app)
 
-    # 3) Save to spreadsheet - drawing_info.xlsx
-    path = system.EXPORT_DIR.joinpath(assembly).joinpath('drawing_info.xlsx')
-    rs.to_excel(str(path), index=False)
+        # 2) Pull drawing info to dict
+        with timing.stage('drawing_info', assembly):
+            drawing_info = idw.get_drawing_info()
 
-    # 4) Export print, pdf and dxf file
-    _export_inventer_drawing(idw, assembly, drawing_info, is_assy=True)
+        # 3) Export print, pdf and dxf file
+        with timing.stage('export', assembly):
+            outputs = _export_inventer_drawing(
+                idw, assembly, drawing_info, is_assy=True)
 
-    # 5) Save to spreadsheet - part_list.xlsx
-    idw.export_part_list('xlsx')
-    idw.close()
+        # 4) Save part list - part_list.csv
+        with timing.stage('part_list', assembly):
+            outputs.append(idw.export_part_list('csv'))
+        with timing.stage('close', assembly):
+            idw.close()
+        manifest.record(idw_path, drawing_info, outputs, references)
+        info_cache().save()
+
+    # 5) Save drawing info
+    journal.append(idw_path, drawing_info, outputs)
+    _save_drawing_info(assembly, journal)
 
     # 6) Open assembly part (iam)
-    path = system.find_path(assembly, 'iam')
-    iam = inventor.Assembly(path, app)
+    iam_path = _find_path(assembly, 'iam', paths)
+    if not manifest.is_fresh(iam_path):
+        with timing.stage('open', assembly):
+            iam = inventor.Assembly(iam_path, app)
 
-    # 7) Save spreadsheet - bom.xlsx
-    iam.export_bom()
-    iam.close()
+        # 7) Save bom - bom.csv
+        with timing.stage('bom', assembly):
+            manifest.record(iam_path, None, [iam.export_bom('csv')])
+        with timing.stage('close', assembly):
+            iam.close()
+
+    manifest.save()
+
+
+def _find_path(partcode, filetype, paths=None):
+    """find Inventor file path, from a saved plan if it has one
+
+    Parameters
+    ----------
+    partcode : str
+        AGR part number usually in 'AGR0000-000-00' format
+    filetype : str
+        inventor file type ('ipt', 'iam', 'idw' or 'dwg')
+    paths : dict
+        partcode -> {filetype: path} resolved by a saved plan, see plan.py
+
+    Returns
+    -------
+    Path : obj
+        Path object from Python pathlib module
+    """
+    path = (paths or {}).get(partcode, {}).get(filetype)
+    if path is not None:
+        return Path(path)
+    return system.find_path(partcode, filetype)
+
+
+def _load_manifest(assembly):
+    """Load the assembly's build manifest
+
+    Parameters
+    ----------
+    assembly: str
+        AGR part number usually in 'AGR0000-000-00' format
+
+    Returns
+    -------
+    Manifest: obj
+        Build manifest from manifest.py
+    """
+    path = system.EXPORT_DIR.joinpath(assembly).joinpath('manifest.json')
+    return Manifest(path).load()
+
+
+def _load_journal(assembly):
+    """Open the assembly's run journal
+
+    Parameters
+    ----------
+    assembly: str
+        AGR part number usually in 'AGR0000-000-00' format
+
+    Returns
+    -------
+    Journal: obj
+        Run journal from journal.py
+    """
+    path = system.EXPORT_DIR.joinpath(assembly).joinpath('journal.jsonl')
+    return Journal(path)
 
 
 def _export_inventer_drawing(idw, assembly, drawing_info, is_assy=False):
     """Export print, pdf and dxf files from one drawing
 
+    The pdf is exported once and then linked into the print folder.
     Used in 'process_assembly(assembly, app)' and
     process_parts(assembly, app) functions.
 
@@ -77,49 +182,191 @@ def _export_inventer_drawing(idw, assembly, drawing_info, is_assy=False):
         Drawing information
     is_assy: bool
         is the part an assenmbly?
+
+    Returns
+    -------
+    outputs: :obj:`list` of obj
+        Path objects of the exported files
     """
-    print_size = drawing_info['size']
-    if print_size == 'A2':
-        print_size = 'A3'
-    print_dir = assembly + '/print/' + print_size + '/'
-    idw.export_to(print_dir, 'pdf')
-    idw.export_to(assembly + '/pdf/', 'pdf')
+    pdf = idw.export_to(assembly + '/pdf/', 'pdf')
+    print_pdf = idw.export_dir.joinpath(
+        _print_dir(assembly, drawing_info['size'])).joinpath(pdf.name)
+    outputs = [pdf] + system.fan_out(pdf, [print_pdf])
     if not is_assy:
         # idw.export_to(assembly + '/dxf/', 'dxf')
         # idw.export_to(assembly + '/dwg/', 'dwg')
         pass
+    return outputs
+
+
+def _print_dir(assembly, size):
+    """str: print folder of a sheet size, A2 drawings are printed on A3"""
+    if size == 'A2':
+        size = 'A3'
+    return assembly + '/print/' + size + '/'
+
+
+def _process_drawing(job, app, backend=None, local=None):
+    """Open, export and close one drawing
+
+    Used in 'process_parts(assembly, app)' directly, and as the task run by
+    the worker pool in parallel mode.
+
+    Parameters
+    ----------
+    job: tuple
+        (path, assembly, is_assy) - idw path, AGR assembly number and
+        whether the part is an assembly
+    app: obj
+        Application object of the backend
+    backend: obj
+        backend module, see backend.py. Defaults to the selected backend
+    local: obj
+        Path object of a staged copy of the drawing to open instead
+
+    Returns
+    -------
+    drawing_info: dict
+        Drawing information
+    outputs: :obj:`list` of obj
+        Path objects of the exported files
+    """
+    if backend is None:
+        backend = backends.inventor()
+    path, assembly, is_assy = job
+    with timing.part(path.stem):
+        with timing.stage('open'):
+            idw = backend.Drawing(local or path, app)
+            idw.source = path
+        try:
+            with timing.stage('drawing_info'):
+                drawing_info = idw.get_drawing_info()
+            with timing.stage('export'):
+                outputs = _export_inventer_drawing(
+                    idw, assembly, drawing_info, is_assy)
+        finally:
+            with timing.stage('close'):
+                idw.close()
+    return drawing_info, outputs
+
+
+def _prefetch(paths):
+    """Stage documents ahead of the exporter
+
+    Each document is staged with the part and assembly files of the same
+    partcode, the models its drawing views usually reference.
+
+    Parameters
+    ----------
+    paths: :obj:`list` of obj
+        Path objects of the documents, in the order they will be opened
+
+    Returns
+    -------
+    Prefetcher: obj
+        Prefetcher from staging.py, 'open(i)' returns the path to open
+        document 'i' from
+    """
+    cache = system.get_staging()
+    groups = []
+    for path in paths:
+        group = [path]
+        if cache is not None:
+            group += _references(path, ('ipt', 'iam'))
+        groups.append(group)
+    return Prefetcher(cache, groups)
+
+
+def _references(path, filetypes=None):
+    """Model files a document usually references
+
+    The part and assembly files of the same partcode. A drawing's pdf
+    shows their geometry, so they are fingerprinted with it in the build
+    manifest.
+
+    Parameters
+    ----------
+    path: obj
+        Path object of the document
+    filetypes: :obj:`tuple` of :obj:`str`
+        file types of the references, ('ipt', 'iam') for a drawing and
+        none for any other file if not given
+
+    Returns
+    -------
+    Path: :obj:`list` of obj
+        Path objects of the referenced files found in the workspace
+    """
+    if filetypes is None:
+        filetypes = ('ipt', 'iam') if path.suffix.lower() == '.idw' else ()
+    index = system.get_index()
+    return [p for filetype in filetypes
+            for p in index.lookup(path.stem, filetype) if p != path]
+
 
-def _load_children(assembly):
+def _load_children(assembly, app=None):
     """Load children from parent
 
     Used in 'create_format_matrix(assembly)' function.
     From the assembly idw's part list and iam's bom, return a list
-    of all the drawings used under this section.
+    of all the drawings used under this section. If they have not been
+    exported yet and 'app' is given, export them first.
 
     Parameters
     ----------
     assembly: str
         AGR part number usually in 'AGR0000-000-00' format
+    app: obj
+        Inventor Application COM Object
 
     Returns
     -------
     partcodes: 'obj' of 'str'
         list of drawings
     """
-    path1 = system.EXPORT_DIR.joinpath(assembly).joinpath('part_list.xlsx')
-    df1 = pd.read_excel(str(path1))
-    p1 = df1.loc[df1['Dwg_No'].notnull(), 'Dwg_No']
+    directory = system.EXPORT_DIR.joinpath(assembly)
+    partcodes = bom.exported_children(directory)
+    if partcodes is None and app is not None:
+        _export_children(assembly, app)
+        partcodes = bom.exported_children(directory)
+    if partcodes is None:
+        print('Unable to find the part list or bom of ' + assembly)
+        return []
+    return partcodes
 
-    path2 = system.EXPORT_DIR.joinpath(assembly).joinpath('bom.xlsx')
-    df2 = pd.read_excel(str(path2))
-    p2 = df2.loc[df2['Part Number'].notnull(), 'Part Number']
 
-    partcodes = [*p1, *p2]
-    partcodes = list(dict.fromkeys(partcodes))
-    return partcodes
+def _export_children(assembly, app):
+    """Export a sub-assembly's part list and bom
+
+    Used in '_load_children(assembly, app)' when walking the bom.
+
+    Parameters
+    ----------
+    assembly: str
+        AGR part number usually in 'AGR0000-000-00' format
+    app: obj
+        Inventor Application COM Object
+    """
+    inventor = backends.inventor()
+    os.makedirs(str(system.EXPORT_DIR.joinpath(assembly)), exist_ok=True)
+
+    iam = inventor.Assembly(system.find_path(assembly, 'iam'), app)
+    iam.export_bom('csv')
+    iam.close()
+
+    paths = system.get_index().lookup(assembly, 'idw')
+    if len(paths) > 0:
+        idw = inventor.Drawing(paths[0], app)
+        idw.export_part_list('csv')
+        idw.close()
+
+
+def _is_assembly(partcode):
+    """bool: does the partcode have an iam file?"""
+    return len(system.get_index().lookup(partcode, 'iam')) > 0
 
 
-def create_format_matrix(assembly):
+def create_format_matrix(assembly, recursive=False, app=None, plan=None):
     """File format type spreadsheeet
 
     Find all ipt, iam, idw and dwg files under the assembly,
@@ -129,42 +376,67 @@ def create_format_matrix(assembly):
     ----------
     assembly: str
         AGR part number usually in 'AGR0000-000-00' format
+    recursive: bool
+        also include everything under the sub-assemblies, deepest first
+    app: obj
+        Inventor Application COM Object, used to export the part list and
+        bom of sub-assemblies that have not been exported yet
+    plan: dict
+        saved plan from plan.py, whose partcodes and formats are used
+        instead of reading the bom and searching the workspace
     """
-    ipt_paths = []
-    iam_paths = []
-    idw_paths = []
-    dwg_paths = []
-    partcodes = _load_children(assembly)
-    for partcode in partcodes:
-        ipt_paths.append(system.find_path(partcode, 'ipt') is not None)
-        iam_paths.append(system.find_path(partcode, 'iam') is not None)
-        idw_paths.append(system.find_path(partcode, 'idw') is not None)
-        dwg_paths.append(system.find_path(partcode, 'dwg') is not None)
+    if plan is not None and plan['children_known']:
+        partcodes = plan['partcodes']
+        formats = {p: set(plan['formats'][p]) for p in partcodes}
+        _write_format_matrix(assembly, partcodes, formats)
+        return
+
+    with timing.stage('load_children'):
+        if recursive:
+            partcodes = bom.walk(
+                assembly, lambda p: _load_children(p, app), _is_assembly)
+        else:
+            partcodes = _load_children(assembly)
+    with timing.stage('find_formats'):
+        formats = system.find_formats(partcodes)
+    timing.count('partcodes', len(partcodes))
+    _write_format_matrix(assembly, partcodes, formats)
+
+
+def _write_format_matrix(assembly, partcodes, formats):
+    """Save the format matrix
 
-    df = pd.DataFrame()
-    df['partcode'] = partcodes
-    df['ipt'] = ipt_paths
-    df['iam'] = iam_paths
-    df['idw'] = idw_paths
-    df['dwg'] = dwg_paths
+    Parameters
+    ----------
+    assembly: str
+        AGR part number usually in 'AGR0000-000-00' format
+    partcodes: :obj:`list` of :obj:`str`
+        every drawing under the assembly
+    formats: dict
+        partcode -> set of file types found for that partcode
+    """
+    import pandas as pd
+    df = pd.DataFrame({'partcode': partcodes})
+    found = df['partcode'].map(formats)
+    for filetype in ['ipt', 'iam', 'idw', 'dwg']:
+        df[filetype] = [filetype in types for types in found]
 
-    path = system.EXPORT_DIR.joinpath(assembly).joinpath('format_type.xlsx')
-    df.to_excel(str(path), index=False)
+    store.write(df, system.EXPORT_DIR.joinpath(assembly), 'format_type')
 
 
-def process_parts(assembly, app):
+def process_parts(assembly, app, workers=1, backend=None, timeout=300,
+                  resume=False, paths=None, partcodes=None, force=()):
     """Process Parts
 
-    1) Load spreadsheet - drawing_info.xlsx
-    2) Load spreadsheet - format_type.xlsx
+    1) Load run journal
+    2) Load format matrix - format_type
     3) Create a list of idw paths
     4) Open each drawings (idw)
     5) Pull drawing info to dict
     6) Export print, pdf and dxf files
-    7) Save spreadsheet - drawing_info.xlsx
+    7) Save drawing info
     8) Create a list of dwg paths
     9) export pdf files (AutoCAD)
-    10) Unzip files
 
     Parameters
     ----------
@@ -172,64 +444,267 @@ def process_parts(assembly, app):
         AGR part number usually in 'AGR0000-000-00' format
     app : obj
         Inventor Application COM Object
+    workers : int
+        number of Inventor sessions to export with. With more than one,
+        each worker process starts its own session and 'app' is unused.
+    backend : str
+        backend name used by the workers, see backend.py. Defaults to the
+        selected backend
+    timeout : float
+        seconds before a worker's drawing is considered hung
+    resume : bool
+        skip the drawings already completed in the journal
+    paths : dict
+        partcode -> {filetype: path} resolved by a saved plan, see plan.py
+    partcodes : :obj:`set` of :obj:`str`
+        only process these partcodes, all in the format matrix if not given
+    force : :obj:`set` of :obj:`str`
+        partcodes exported even if the manifest has them as unchanged
+
+    Returns
+    -------
+    errors : dict
+        partcode -> error message, for the drawings that failed to export
     """
-    # 1) Load spreadsheet - drawing_info.xlsx
-    info_path = system.EXPORT_DIR.joinpath(assembly).joinpath('drawing_info.xlsx')
-    if os.path.exists(str(info_path)):
-        rs = pd.read_excel(str(info_path))
-    else:
-        rs = pd.DataFrame(columns=['partcode', 'rev', 'desc', 'material', 'finish', 'size'])
+    errors = {}
+
+    # 1) Load run journal
+    journal = _load_journal(assembly)
+    completed = journal.records() if resume else {}
 
-    # 2) Load spreadsheet -  format_type.xlsx, create a list of idw paths
-    path = system.EXPORT_DIR.joinpath(assembly).joinpath('format_type.xlsx')
-    df = pd.read_excel(str(path))
+    # 2) Load format matrix - format_type
+    df = store.read(system.EXPORT_DIR.joinpath(assembly), 'format_type')
+    if partcodes is not None:
+        df = df.loc[df['partcode'].isin(partcodes)]
     inv_df = df.loc[df['idw']==True, ['partcode', 'iam']]
     atc_df = df.loc[df['dwg']==True, ['partcode']]
 
     # 3) Create a list of idw paths
+    resolved = paths
     paths = []
     for partcode in inv_df['partcode']:
-        path = system.find_path(partcode, 'idw')
+        path = _find_path(partcode, 'idw', resolved)
         paths.append(path)
 
-    # 4) Open each drawings
+    # 4) Open each drawings, skipping the ones unchanged since the last run
     # 5) Pull drawing info to dict
     # 6) export print, pdf and dxf files
-    # 7) Save spreadsheet - drawing_info.xlsx
+    # 7) Save drawing info
+    manifest = _load_manifest(assembly)
+    if resume:
+        _seed_manifest(manifest, completed)
     if len(paths) > 0:
-        for path, is_assy in zip(paths, df['iam']):
-            idw = inventor.Drawing(path, app)
-            drawing_info = idw.get_drawing_info()
-            rs = rs.append(drawing_info, ignore_index=True)
-            _export_inventer_drawing(idw, assembly, drawing_info, is_assy)
-            idw.close()
+        jobs = []
+        for path, is_assy in zip(paths, inv_df['iam']):
+            if str(path) in completed:
+                continue
+            with timing.stage('manifest_check', path.stem):
+                fresh = path.stem not in force and manifest.is_fresh(
+                    path, _references(path))
+            if fresh:
+                journal.append(
+                    path, manifest.drawing_info(path), manifest.outputs(path))
+                timing.count('drawings_skipped')
+            else:
+                jobs.append((path, assembly, is_assy))
+
+        cache = info_cache()
+        exported = 0
+
+        def record(index, result):
+            nonlocal exported
+            path = jobs[index][0]
+            drawing_info, outputs = result
+            with timing.stage('record', path.stem):
+                journal.append(path, drawing_info, outputs)
+                manifest.record(
+                    path, drawing_info, outputs, _references(path))
+                # drawings read in worker processes are cached here
+                if not cache.is_fresh(path):
+                    cache.record(path, drawing_info, [])
+                exported += 1
+                if exported % MANIFEST_SAVE_EVERY == 0:
+                    manifest.save()
+            timing.count('drawings_exported')
 
-        rs.to_excel(str(info_path), index=False)
+        if workers > 1 and len(jobs) > 1:
+            # stages timed inside the worker processes are not collected
+            with timing.stage('pool'):
+                results, failed = pool.run(
+                    _process_drawing, jobs, workers,
+                    backend or backends.current(), timeout, on_result=record)
+            for index, error in failed.items():
+                print('Unable to export ' + str(jobs[index][0]) + ': ' + error)
+                errors[jobs[index][0].stem] = error
+        else:
+            with _prefetch([job[0] for job in jobs]) as fetch:
+                for index, job in enumerate(jobs):
+                    try:
+                        result = _process_drawing(
+                            job, app, local=fetch.open(index))
+                    except Exception as e:
+                        print('Unable to export ' + str(job[0]) + ': ' + repr(e))
+                        errors[job[0].stem] = repr(e)
+                        continue
+                    record(index, result)
+        manifest.save()
+        cache.save()
+
+        _save_drawing_info(assembly, journal)
 
     # 8) Create a list of dwg paths
     paths = []
     for partcode in atc_df['partcode']:
-        path = system.find_path(partcode, 'dwg')
-        paths.append(path)
+        path = _find_path(partcode, 'dwg', resolved)
+        if str(path) in completed:
+            continue
+        if path.stem in force or not manifest.is_fresh(path):
+            paths.append(path)
 
-    # 9) export pdf files (AutoCAD)
-    autocad_app = autocad.application()
+    # 9) export pdf files (AutoCAD), all drawings in one script
     if len(paths) > 0:
-        for path in paths:
-            dwg = autocad.Drawing(path, autocad_app)
-            dwg.export_to(assembly + r'\from_autocad', 'pdf')
-            dwg.close()
+        autocad = backends.autocad()
+        autocad_app = autocad.application()
+        with timing.stage('autocad_export'):
+            outputs, missing = autocad.batch_export(
+                paths, assembly + '/from_autocad', autocad_app)
+        timing.count('dwg_exported', len(outputs) - len(missing))
+        for path, output in zip(paths, outputs):
+            if output in missing:
+                print('Unable to export ' + str(path))
+                errors[path.stem] = 'no {} exported'.format(output.suffix[1:])
+                continue
+            journal.append(path, None, [output])
+            manifest.record(path, None, [output])
+        manifest.save()
+    return errors
+
+
+def _seed_manifest(manifest, records):
+    """Record the drawings a crashed run completed in the manifest
+
+    The manifest is saved every MANIFEST_SAVE_EVERY drawings, the journal
+    after every drawing, so the drawings completed since the last save
+    are only in the journal.
+
+    Parameters
+    ----------
+    manifest: obj
+        Build manifest from manifest.py
+    records: dict
+        source path -> journal record, see Journal.records
+    """
+    for source, record in records.items():
+        references = _references(Path(source))
+        if manifest.is_fresh(source, references):
+            continue
+        if not os.path.exists(source):
+            continue
+        if all(os.path.exists(output) for output in record['outputs']):
+            manifest.record(Path(source), record['drawing_info'],
+                            record['outputs'], references)
+    manifest.save()
+
+
+def _save_drawing_info(assembly, journal):
+    """Save drawing info
+
+    Rebuilt from the run journal, so it also covers the drawings
+    completed before an interrupted run was resumed.
+
+    Parameters
+    ----------
+    assembly: str
+        AGR part number usually in 'AGR0000-000-00' format
+    journal: obj
+        Run journal from journal.py
+    """
+    import pandas as pd
+    rs = pd.DataFrame(journal.drawing_info(), columns=DRAWING_INFO_COLUMNS)
+    store.write(rs, system.EXPORT_DIR.joinpath(assembly), 'drawing_info')
+
 
-    # 10) Unzip files
-    # for partcode in inv_df['partcode']:
-    #     file = partcode + '.zip'
-    #     export_path = system.EXPORT_DIR.joinpath(assembly).joinpath('dxf')
-    #     with zipfile.ZipFile(str(export_path.joinpath(file)), 'r') as zip_ref:
-    #         zip_ref.extractall(str(export_path))
-    #     os.remove(str(export_path.joinpath(file)))
+def write_report(assembly):
+    """Excel report
+
+    Save the drawing info and format matrix of an exported assembly as
+    drawing_info.xlsx and format_type.xlsx.
+
+    Parameters
+    ----------
+    assembly: str
+        AGR part number usually in 'AGR0000-000-00' format
+    """
+    directory = system.EXPORT_DIR.joinpath(assembly)
+    for name in ('drawing_info', 'format_type'):
+        if store.find(directory, name) is not None:
+            df = store.read(directory, name)
+            with timing.stage('excel_report'):
+                df.to_excel(str(directory.joinpath(name + '.xlsx')), index=False)
+
+
+def report_drawing_info(assembly, app=None):
+    """Main - Drawing Info Report
+
+    Build the drawing info report of an assembly whose format matrix has
+    been created, without exporting anything. Drawings with a fresh entry
+    in the drawing info cache are not opened.
+
+    Parameters
+    ----------
+    assembly : str
+        AGR part number usually in 'AGR0000-000-00' format
+    app : obj
+        Inventor Application COM Object or backend.Session, started only
+        if a drawing has to be opened
+    """
+    inventor = backends.inventor()
+    import pandas as pd
+    cache = info_cache()
+    directory = system.EXPORT_DIR.joinpath(assembly)
+    df = store.read(directory, 'format_type')
+    partcodes = [assembly, *df.loc[df['idw']==True, 'partcode']]
+
+    rows = []
+    for partcode in partcodes:
+        path = system.find_path(partcode, 'idw')
+        if path is None:
+            continue
+        if cache.is_fresh(path):
+            rows.append(cache.drawing_info(path))
+            continue
+        app = backends.application(app)
+        idw = inventor.Drawing(path, app)
+        rows.append(idw.get_drawing_info())
+        idw.close()
+    cache.save()
 
+    rs = pd.DataFrame(rows, columns=DRAWING_INFO_COLUMNS)
+    store.write(rs, directory, 'drawing_info')
+    write_report(assembly)
 
-def batch_export(assembly):
+
+def build_print_sets(assembly, force=False, app=None):
+    """Main - Print Sets
+
+    Merge the print folders of an exported assembly into one pdf per sheet
+    size, see printset.build. Nothing is opened in Inventor.
+
+    Parameters
+    ----------
+    assembly : str
+        AGR part number usually in 'AGR0000-000-00' format
+    force : bool
+        merge every print set, even the unchanged ones
+    app : obj
+        not used, accepted so it runs as a job like the other commands
+    """
+    for path in printset.build(assembly, force):
+        print('Print set saved to ' + str(path))
+
+
+def batch_export(assembly, workers=1, force=False, app=None, report=True,
+                 recursive=False, plan=None, print_sets=True):
     """Main - Batch Export Drawing
 
     1) Create project folder
@@ -237,97 +712,482 @@ def batch_export(assembly):
     3) Process assembly
     4) Find all idw part files in the vault
     5) Process parts
+    6) Save Excel report
+    7) Merge print sets
+
+    Parameters
+    ----------
+    assembly : str
+        AGR part number usually in 'AGR0000-000-00' format
+    workers : int
+        number of Inventor sessions used to export the parts
+    force : bool
+        export every drawing, even the ones unchanged since the last run
+    app : obj
+        Inventor Application COM Object or backend.Session, started if not
+        given
+    report : bool
+        save drawing_info.xlsx and format_type.xlsx at the end
+    recursive : bool
+        also export the drawings under every sub-assembly
+    plan : dict
+        saved plan of this batch export from plan.py, used instead of
+        resolving the partcodes again
+    print_sets : bool
+        merge the print folders into one pdf per sheet size at the end
+
+    Returns
+    -------
+    errors : dict
+        partcode -> error message, for the drawings that failed to export
     """
+    paths = plan['paths'] if plan is not None else None
     system.create_project(assembly)
-    app = inventor.application()
-    process_assembly(assembly, app)
-    create_format_matrix(assembly)
-    process_parts(assembly, app)
+    if force:
+        _load_manifest(assembly).path.unlink(missing_ok=True)
+    app = backends.application(app)
+    with timing.stage('process_assembly'):
+        process_assembly(assembly, app, paths)
+    with timing.stage('create_format_matrix'):
+        create_format_matrix(assembly, recursive, app, plan)
+    with timing.stage('process_parts'):
+        errors = process_parts(assembly, app, workers, paths=paths)
+    if report:
+        with timing.stage('write_report'):
+            write_report(assembly)
+    if print_sets:
+        with timing.stage('print_sets'):
+            printset.build(assembly)
+    return errors
 
 
-def batch_export_from(filename, filetype):
-    app = inventor.application()
+def resume(assembly, workers=1, app=None, report=True, print_sets=True):
+    """Main - Resume Batch Export
 
-    with open(str(system.EXPORT_DIR.joinpath(filename))) as file:
-        partcodes = [line.strip() for line in file]
+    Continue an interrupted 'batch_export(assembly)' from the first drawing
+    missing from the run journal, then rebuild the drawing info from the
+    journal. Starts a new batch export if the assembly stage never
+    finished.
 
-    paths = []
-    ipt_convert = [
-        'CATPart', 'jt', 'ipt', 'igs', 'iges', 'sat',
-        'smt', 'stl', 'step', 'stp', 'xgl', 'zgl'
-    ]
-    for partcode in partcodes:
-        if filetype in ipt_convert:
-            path = system.find_path(partcode, 'ipt')
-        else:
-            path = system.find_path(partcode, 'idw')
-        paths.append(path)
+    Parameters
+    ----------
+    assembly : str
+        AGR part number usually in 'AGR0000-000-00' format
+    workers : int
+        number of Inventor sessions used to export the parts
+    app : obj
+        Inventor Application COM Object or backend.Session, started if not
+        given
+    report : bool
+        save drawing_info.xlsx and format_type.xlsx at the end
+    print_sets : bool
+        merge the print folders into one pdf per sheet size at the end
+
+    Returns
+    -------
+    errors : dict
+        partcode -> error message, for the drawings that failed to export
+    """
+    journal = _load_journal(assembly)
+    matrix = store.find(system.EXPORT_DIR.joinpath(assembly), 'format_type')
+    if not journal.exists() or matrix is None:
+        return batch_export(assembly, workers, app=app, report=report,
+                            print_sets=print_sets)
+    app = backends.application(app)
+    errors = process_parts(assembly, app, workers, resume=True)
+    _save_drawing_info(assembly, journal)
+    if report:
+        write_report(assembly)
+    if print_sets:
+        printset.build(assembly)
+    return errors
+
+
+def _claim_zip(partcode, filetype, directory):
+    """Keep an exported archive apart from the next format's
+
+    Some translators (e.g. dxf of a multi-sheet drawing) save
+    '<partcode>.zip' instead of a single file. The archive is renamed to
+    '<partcode>.<filetype>.zip' straight after the export, so exporting
+    the next format cannot overwrite it before it is extracted.
+
+    Parameters
+    ----------
+    partcode : str
+        AGR part number usually in 'AGR0000-000-00' format
+    filetype : str
+        file format just exported
+    directory : obj
+        Path object of the folder the archive was exported to
+
+    Returns
+    -------
+    Path : obj
+        Path object of the renamed archive, None if no archive was exported
+    """
+    path = directory.joinpath(partcode + '.zip')
+    if not path.exists():
+        return None
+    archive = directory.joinpath(partcode + '.' + filetype + '.zip')
+    os.replace(str(path), str(archive))
+    return archive
+
+
+def _extract_zip(archive, directory, partcode):
+    """Unzip an exported archive in place
+
+    Its members are written straight into the directory and the archive
+    is deleted.
+
+    Parameters
+    ----------
+    archive : obj
+        Path object of the archive
+    directory : obj
+        Path object of the folder to extract to
+    partcode : str
+        AGR part number usually in 'AGR0000-000-00' format
+
+    Returns
+    -------
+    names : :obj:`list` of :obj:`str`
+        files extracted
+    """
+    with timing.stage('unzip', partcode):
+        with zipfile.ZipFile(str(archive), 'r') as zip_ref:
+            names = zip_ref.namelist()
+            zip_ref.extractall(str(directory))
+    os.remove(str(archive))
+    return names
+
+
+def _finish_export(partcode, filetype, archive=None, on_export=None):
+    """Extract an exported file's archive and hand on the files
+
+    Parameters
+    ----------
+    partcode : str
+        AGR part number usually in 'AGR0000-000-00' format
+    filetype : str
+        Inventor supported file format
+    archive : obj
+        Path object of the archive from '_claim_zip', None if the export
+        wrote a single file
+    on_export : function
+        'on_export(partcode, paths)' called with the Path objects of the
+        files the export produced
+    """
+    if archive is not None:
+        names = _extract_zip(archive, system.EXPORT_DIR, partcode)
+    else:
+        names = [partcode + '.' + filetype]
+    if on_export is not None:
+        on_export(partcode, [system.EXPORT_DIR.joinpath(name) for name in names])
+
+
+def _extract_errors(futures):
+    """Wait for the archives being extracted
+
+    Parameters
+    ----------
+    futures : dict
+        (partcode, filetype) -> Future of '_finish_export'
+
+    Returns
+    -------
+    errors : dict
+        partcode -> error message, for the archives that failed
+    """
+    errors = {}
+    for (partcode, filetype), future in futures.items():
+        try:
+            future.result()
+        except (zipfile.BadZipFile, OSError) as e:
+            errors[partcode] = repr(e)
+            print('Unable to extract {}.{}.zip: {!r}'.format(
+                partcode, filetype, e))
+    return errors
 
-    for path in paths:
-        if filetype in ipt_convert:
-            inv = inventor.Part(path, app)
-        else:
-            inv = inventor.Drawing(path, app)
-        inv.export_to(system.EXPORT_DIR, filetype)
-        inv.close()
 
+def _source_groups(filetypes):
+    """Split file formats by the file they are exported from
+
+    Parameters
+    ----------
+    filetypes : :obj:`list` of :obj:`str`
+        Inventor supported file formats
+
+    Returns
+    -------
+    groups : :obj:`list` of :obj:`tuple`
+        (source file type, file formats) - IPT_CONVERT formats from the
+        ipt, the rest from the idw
+    """
+    idw = [filetype for filetype in filetypes if filetype not in IPT_CONVERT]
+    ipt = [filetype for filetype in filetypes if filetype in IPT_CONVERT]
+    return [(source, formats) for source, formats in (('idw', idw), ('ipt', ipt))
+            if formats]
+
+
+def _export_documents(partcodes, filetypes, app, on_export=None, paths=None):
+    """Export partcodes to several formats, opening each file once
+
+    Each archive is extracted in a background thread while the next
+    format or file is exported.
+
+    Parameters
+    ----------
+    partcodes : :obj:`list` of :obj:`str`
+        AGR part numbers usually in 'AGR0000-000-00' format
+    filetypes : :obj:`list` of :obj:`str`
+        Inventor supported file formats
+    app : obj
+        Inventor Application COM Object
+    on_export : function
+        'on_export(partcode, paths)' called from the background thread
+        with the files each export produced, once they are extracted
+    paths : dict
+        partcode -> {filetype: path} resolved by a saved plan, see plan.py
+
+    Returns
+    -------
+    errors : dict
+        partcode -> error message, for the partcodes without a file to
+        export from, the files that failed to open or export and the
+        archives that failed to extract
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    documents = []
+    missing = {}
     for partcode in partcodes:
+        for source, formats in _source_groups(filetypes):
+            path = _find_path(partcode, source, paths)
+            if path is not None:
+                documents.append((partcode, source, formats, path))
+            else:
+                missing[partcode] = 'no {} file found'.format(source)
+
+    futures = {}
+    failed = {}
+    with ThreadPoolExecutor(max_workers=1) as unzip, \
+            _prefetch([document[3] for document in documents]) as fetch:
+        for i, (partcode, source, formats, path) in enumerate(documents):
+            try:
+                _export_document(partcode, source, formats, path,
+                                 fetch.open(i), app, unzip, futures, on_export)
+            except Exception as e:
+                print('Unable to export ' + str(path) + ': ' + repr(e))
+                failed[partcode] = repr(e)
+    errors = _extract_errors(futures)
+    errors.update(missing)
+    errors.update(failed)
+    return errors
+
+
+def _export_document(partcode, source, formats, path, local, app, unzip,
+                     futures, on_export):
+    """Open one file, export it to each format and close it
+
+    Parameters
+    ----------
+    partcode : str
+        AGR part number usually in 'AGR0000-000-00' format
+    source : str
+        'ipt' or 'idw'
+    formats : :obj:`list` of :obj:`str`
+        Inventor supported file formats exported from the file
+    path : obj
+        Path object of the file
+    local : obj
+        Path object of the staged copy to open
+    app : obj
+        Inventor Application COM Object
+    unzip : obj
+        executor the archives are extracted in
+    futures : dict
+        (partcode, filetype) -> future, the extraction of each archive is
+        added to it
+    on_export : function
+        passed on to '_finish_export'
+    """
+    inventor = backends.inventor()
+    with timing.part(partcode):
+        with timing.stage('open'):
+            if source == 'ipt':
+                inv = inventor.Part(local, app)
+            else:
+                inv = inventor.Drawing(local, app)
+            inv.source = path
         try:
-            file = partcode + '.zip'
-            export_path = system.EXPORT_DIR
-            with zipfile.ZipFile(str(export_path.joinpath(file)), 'r') as zip_ref:
-                zip_ref.extractall(str(export_path))
-            os.remove(str(export_path.joinpath(file)))
-        except:
-            pass
+            for filetype in formats:
+                with timing.stage('export'):
+                    inv.export_to(system.EXPORT_DIR, filetype)
+                archive = _claim_zip(partcode, filetype, system.EXPORT_DIR)
+                futures[(partcode, filetype)] = unzip.submit(
+                    _finish_export, partcode, filetype, archive, on_export)
+        finally:
+            with timing.stage('close'):
+                inv.close()
 
 
-def export_to(partcode, filetype):
-    """Main - Export to ...
+def batch_export_from(filename, filetypes, app=None, on_export=None, plan=None):
+    """Main - Batch Export from <file> to <file formats>
+
+    Export every partcode listed in the file, one per line, to each of the
+    file formats. Each ipt and idw is opened once for all of its formats.
+
+    Parameters
+    ----------
+    filename : str
+        file name in the export directory
+    filetypes : :obj:`list` of :obj:`str`
+        Inventor supported file formats, or a single one
+    app : obj
+        Inventor Application COM Object or backend.Session, started if not
+        given
+    on_export : function
+        'on_export(partcode, paths)' called from the background thread
+        with the files each export produced, once they are extracted
+    plan : dict
+        saved plan of this export from plan.py, used instead of reading the
+        file and resolving the partcodes again
 
-    Export one drawing to the specified file format
+    Returns
+    -------
+    errors : dict
+        partcode -> error message, for the partcodes not found and the
+        archives that failed to extract
     """
-    app = inventor.application()
-    ipt_convert = [
-        'CATPart', 'jt', 'ipt', 'igs', 'iges', 'sat',
-        'smt', 'stl', 'step', 'stp', 'xgl', 'zgl'
-    ]
-    if filetype in ipt_convert:
-        path = system.find_path(partcode, 'ipt')
-        inv = inventor.Part(path, app)
+    if isinstance(filetypes, str):
+        filetypes = [filetypes]
+    app = backends.application(app)
+
+    if plan is not None:
+        partcodes = plan['partcodes']
     else:
-        path = system.find_path(partcode, 'idw')
-        inv = inventor.Drawing(path, app)
-    inv.export_to(system.EXPORT_DIR, filetype)
-    inv.close()
-
-    try:
-        file = partcode + '.zip'
-        export_path = system.EXPORT_DIR
-        with zipfile.ZipFile(str(export_path.joinpath(file)), 'r') as zip_ref:
-            zip_ref.extractall(str(export_path))
-        os.remove(str(export_path.joinpath(file)))
-    except:
-        pass
+        with open(str(system.EXPORT_DIR.joinpath(filename))) as file:
+            partcodes = [line.strip() for line in file if line.strip()]
+    paths = plan['paths'] if plan is not None else None
+    return _export_documents(partcodes, filetypes, app, on_export, paths)
 
 
-def cnc_batch_export_from(filename):
-    """export dxf files and save them on a memory stick for cnc"""
-    batch_export_from(filename, 'dxf')
-    with open(str(system.EXPORT_DIR.joinpath(filename))) as file:
-        partcodes = [line.strip() for line in file]
+def export_to(partcode, filetypes, app=None, on_export=None):
+    """Main - Export to ...
 
-    for partcode in partcodes:
-        file = partcode + '.dxf'
-        path = system.EXPORT_DIR.joinpath(file)
-        os.remove("G:/" + file)
-        os.rename(str(path), "G:/" + file)
-
-
-def cnc_export_to(partcode):
-    """export dxf file and save them on a memory stick for cnc"""
-    export_to(partcode, 'dxf')
-    file = partcode + '.dxf'
-    path = system.EXPORT_DIR.joinpath(file)
-    os.remove("G:/" + file)
-    os.rename(str(path), "G:/" + file)
+    Export one partcode to each of the file formats, opening its ipt and
+    idw once each.
+
+    Parameters
+    ----------
+    partcode : str
+        AGR part number usually in 'AGR0000-000-00' format
+    filetypes : :obj:`list` of :obj:`str`
+        Inventor supported file formats, or a single one
+    app : obj
+        Inventor Application COM Object or backend.Session, started if not
+        given
+    on_export : function
+        'on_export(partcode, paths)' called with the files the export
+        produced, once they are extracted
+
+    Returns
+    -------
+    errors : dict
+        partcode -> error message, if it was not found or an archive
+        failed to extract
+    """
+    if isinstance(filetypes, str):
+        filetypes = [filetypes]
+    app = backends.application(app)
+    return _export_documents([partcode], filetypes, app, on_export)
+
+
+def _transfer_errors(transfers):
+    """Wait for the files being moved to the CNC drive
+
+    Parameters
+    ----------
+    transfers : :obj:`list` of tuple
+        (partcode, path, Future of 'system.transfer')
+
+    Returns
+    -------
+    errors : dict
+        partcode -> error message, for the files that failed to move
+    """
+    errors = {}
+    for partcode, path, future in transfers:
+        try:
+            future.result()
+        except OSError as e:
+            errors[partcode] = repr(e)
+            print('Unable to transfer ' + str(path) + ': ' + repr(e))
+    return errors
+
+
+def cnc_batch_export_from(filename, app=None, target=None, workers=4):
+    """export dxf files and save them on a memory stick for cnc
+
+    Each dxf is moved to the CNC drive by a small thread pool as soon as
+    it has been exported, while the next one is exporting.
+
+    Parameters
+    ----------
+    filename : str
+        file name in the export directory
+    app : obj
+        Inventor Application COM Object or backend.Session, started if not
+        given
+    target : obj
+        Path object of the CNC folder, system.CNC_DIR if not given
+    workers : int
+        number of files copied at the same time
+
+    Returns
+    -------
+    errors : dict
+        partcode -> error message, for the files that failed
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    target = target or system.CNC_DIR
+    transfers = []
+    with ThreadPoolExecutor(max_workers=workers) as copy:
+        def on_export(partcode, paths):
+            for path in paths:
+                transfers.append(
+                    (partcode, path, copy.submit(system.transfer, path, target)))
+        errors = batch_export_from(filename, 'dxf', app, on_export)
+    errors.update(_transfer_errors(transfers))
+    return errors
+
+
+def cnc_export_to(partcode, app=None, target=None):
+    """export dxf file and save them on a memory stick for cnc
+
+    Parameters
+    ----------
+    partcode : str
+        AGR part number usually in 'AGR0000-000-00' format
+    app : obj
+        Inventor Application COM Object or backend.Session, started if not
+        given
+    target : obj
+        Path object of the CNC folder, system.CNC_DIR if not given
+
+    Returns
+    -------
+    errors : dict
+        partcode -> error message, if the file failed
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    target = target or system.CNC_DIR
+    transfers = []
+    with ThreadPoolExecutor(max_workers=1) as copy:
+        def on_export(partcode, paths):
+            for path in paths:
+                transfers.append(
+                    (partcode, path, copy.submit(system.transfer, path, target)))
+        errors = export_to(partcode, 'dxf', app, on_export)
+    errors.update(_transfer_errors(transfers))
+    return errors
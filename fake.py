@@ -0,0 +1,180 @@
+"""
+Fake Inventor Backend
+"""
+
+import system
+import backend
+
+import hashlib
+import time
+import os
+
+
+# Simulated latency in seconds, overridable through the environment so
+# worker processes pick up the same values as the parent.
+OPEN_LATENCY = float(os.environ.get('FAKE_OPEN_LATENCY', '0.05'))
+EXPORT_LATENCY = float(os.environ.get('FAKE_EXPORT_LATENCY', '0.02'))
+CLOSE_LATENCY = float(os.environ.get('FAKE_CLOSE_LATENCY', '0.01'))
+
+
+def pdf(text):
+    """Minimal valid one-page pdf
+
+    Parameters
+    ----------
+    text : str
+        written as a comment in the file, e.g. the partcode
+
+    Returns
+    -------
+    bytes
+        pdf file contents
+    """
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 842 595] >>',
+    ]
+    data = b'%PDF-1.4\n% ' + text.encode() + b'\n'
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b'%d 0 obj\n' % number + obj + b'\nendobj\n'
+    xref = len(data)
+    data += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    data += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    data += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objects) + 1, xref)
+    return data
+
+
+class Application:
+    """Fake Application
+
+    Stand-in for the Inventor Application COM Object.
+
+    Attributes
+    ----------
+    opened : int
+        number of documents opened in this session
+    """
+
+    def __init__(self, silent=True, visible=True):
+        self.SilentOperation = silent
+        self.Visible = visible
+        self.opened = 0
+
+    def Quit(self):
+        pass
+
+
+class Document(backend.Document):
+    """Fake Document
+
+    Same interface as inventor.Document. Opening, exporting and closing
+    sleep for the configured latency, and exports write a small
+    placeholder file, a blank one-page pdf for pdf exports.
+
+    Parameters
+    ----------
+    path : obj
+        Path object from python pathlib module
+    app : obj
+        Fake Application object
+    export_dir : str
+        Export directory location, system.EXPORT_DIR if not given
+    """
+
+    def __init__(self, path, app, export_dir=None):
+        time.sleep(OPEN_LATENCY)
+        app.opened += 1
+        self.app = app
+        self.export_dir = export_dir or system.EXPORT_DIR
+        self.path = path
+        self.source = path
+
+    def _write(self, path, text):
+        os.makedirs(str(path.parent), exist_ok=True)
+        with open(str(path), 'wb' if isinstance(text, bytes) else 'w') as f:
+            f.write(text)
+        return path
+
+    def _children(self):
+        """Partcodes listed one per line in the assembly file, if any"""
+        iam = self.path.with_suffix('.iam')
+        if not iam.exists():
+            return []
+        with open(str(iam)) as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def export_to(self, subdir, filetype='pdf'):
+        """Write a placeholder file into the export directory"""
+        if not isinstance(filetype, str):
+            return [self.export_to(subdir, f) for f in filetype]
+        time.sleep(EXPORT_LATENCY)
+        file = self.partcode + '.' + filetype
+        path = self.export_dir.joinpath(subdir).joinpath(file)
+        if filetype == 'pdf':
+            return self._write(path, pdf(self.partcode))
+        return self._write(path, self.partcode + '\n')
+
+    def close(self):
+        time.sleep(CLOSE_LATENCY)
+
+
+class Drawing(Document, backend.Drawing):
+    """Fake Drawing Document"""
+
+    def get_drawing_sheet_size(self):
+        """Sheet size derived from the partcode, so it is deterministic"""
+        digest = hashlib.md5(self.partcode.encode()).digest()
+        return ['A0', 'A1', 'A2', 'A3', 'A4'][digest[0] % 5]
+
+    def get_drawing_info(self):
+        return {
+            'partcode': self.partcode,
+            'rev': 0,
+            'desc': 'Fake ' + self.partcode,
+            'material': 'Mild Steel',
+            'finish': 'None',
+            'size': self.get_drawing_sheet_size()
+        }
+
+    def export_part_list(self, filetype='csv'):
+        """Part list of the assembly next to the drawing, as a csv"""
+        time.sleep(EXPORT_LATENCY)
+        file = 'part_list.' + filetype
+        path = self.export_dir.joinpath(self.partcode).joinpath(file)
+        return self._write(path, 'Dwg_No\n' + ''.join(
+            child + '\n' for child in self._children()))
+
+
+class Assembly(Document, backend.Assembly):
+    """Fake Assembly Document
+
+    The placeholder assembly file lists its children's partcodes, one
+    per line.
+    """
+
+    def export_bom(self, filetype='csv'):
+        """Bom of the assembly, as a csv"""
+        time.sleep(EXPORT_LATENCY)
+        file = 'bom.' + filetype
+        path = self.export_dir.joinpath(self.partcode).joinpath(file)
+        return self._write(path, 'Part Number\n' + ''.join(
+            child + '\n' for child in self._children()))
+
+
+class Part(Document):
+    """Fake Part Document"""
+    pass
+
+
+def process_id(app):
+    """Fake sessions run in the worker process itself, there is none"""
+    return None
+
+
+def application(silent=True, visible=True, new_instance=False):
+    """Fake Application object, same signature as inventor.application"""
+    return Application(silent, visible)
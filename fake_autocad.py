@@ -0,0 +1,84 @@
+"""
+Fake AutoCAD Backend
+"""
+
+import system
+import autocad
+import fake
+
+import time
+import re
+import os
+
+
+class ScriptSink:
+    """Fake AutoCAD Script Sink
+
+    Stand-in for autocad.ScriptSink. Keeps every script it is given and
+    writes a placeholder for each quoted path on a line that is not an
+    OPEN, a blank one-page pdf for pdf exports.
+
+    Attributes
+    ----------
+    scripts : :obj:`list` of :obj:`str`
+        scripts received
+    """
+
+    def __init__(self):
+        self.scripts = []
+
+    def __call__(self, script):
+        self.scripts.append(script)
+        for line in script.splitlines():
+            if '_.OPEN' in line:
+                time.sleep(fake.OPEN_LATENCY)
+                continue
+            for path in re.findall(r'"([^"]+)"', line):
+                time.sleep(fake.EXPORT_LATENCY)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if path.endswith('.pdf'):
+                    with open(path, 'wb') as f:
+                        f.write(fake.pdf(path))
+                    continue
+                with open(path, 'w') as f:
+                    f.write(path + '\n')
+
+
+class Application:
+    """Fake Application
+
+    Stand-in for the AutoCAD Application COM Object.
+
+    Attributes
+    ----------
+    opened : int
+        number of documents opened in this session
+    sink : obj
+        ScriptSink every script is run in
+    """
+
+    def __init__(self, visible=True):
+        self.Visible = visible
+        self.opened = 0
+        self.sink = ScriptSink()
+
+
+class Drawing(fake.Document):
+    """Fake AutoCAD Drawing Document"""
+    pass
+
+
+def application(visible=True):
+    """Fake Application object, same signature as autocad.application"""
+    return Application(visible)
+
+
+def batch_export(paths, subdir, app=None, filetype='pdf', export_dir=None,
+                 sink=None, timeout=600):
+    """Same as autocad.batch_export, run in the fake application's sink"""
+    if sink is None:
+        sink = app.sink
+    return autocad.batch_export(
+        paths, subdir, filetype=filetype,
+        export_dir=export_dir or system.EXPORT_DIR, sink=sink,
+        timeout=timeout)
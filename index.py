@@ -0,0 +1,233 @@
+"""
+Partcode File Index
+"""
+
+from pathlib import Path
+
+import json
+import os
+
+
+FILETYPES = ('ipt', 'iam', 'idw', 'dwg')
+
+
+class PartIndex:
+    """Partcode File Index
+
+    Persistent map of partcode to Inventor/AutoCAD file paths under the
+    workspace. The workspace is laid out as 'root/client/project/section/file'.
+    Each section directory is stored with its mtime, so a refresh only
+    re-lists the sections whose contents have changed since the last scan.
+
+    Parameters
+    ----------
+    root : obj
+        Path object of the workspace directory (INVENTOR_DIR)
+    path : obj
+        Path object of the json file the index is saved to
+
+    Attributes
+    ----------
+    root : obj
+        Path object of the workspace directory
+    path : obj
+        Path object of the json file the index is saved to
+    sections : dict
+        section directory -> {'mtime': float, 'files': {filename: mtime}}
+    """
+
+    def __init__(self, root, path):
+        self.root = Path(root)
+        self.path = Path(path)
+        self.sections = {}
+        self._lookup = {}
+        self._found = {}
+
+    def load(self):
+        """Load the index from disk
+
+        A missing or unreadable index file leaves the index empty, so the
+        next refresh becomes a full rebuild.
+        """
+        try:
+            with open(str(self.path)) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            data = {}
+        if data.get('root') == str(self.root):
+            self.sections = data.get('sections', {})
+        else:
+            self.sections = {}
+        self._build_lookup()
+
+    def save(self):
+        """Save the index to disk"""
+        data = {'root': str(self.root), 'sections': self.sections}
+        tmp = self.path.with_suffix('.tmp')
+        os.makedirs(str(self.path.parent), exist_ok=True)
+        with open(str(tmp), 'w') as file:
+            json.dump(data, file)
+        os.replace(str(tmp), str(self.path))
+
+    def rebuild(self):
+        """Rebuild the index from scratch
+
+        Returns
+        -------
+        changed : :obj:`set` of :obj:`str`
+            partcodes that were added, removed or modified
+        """
+        self.sections = {}
+        return self.refresh()
+
+    def refresh(self, partcodes=()):
+        """Refresh the index incrementally
+
+        Walk the client and project directories and stat every section
+        directory. Only sections with a new mtime are listed again. Adding
+        or removing a file changes its directory's mtime, editing it in
+        place does not, so the files of 'partcodes' are also statted in
+        the sections that were not listed again.
+
+        Parameters
+        ----------
+        partcodes : :obj:`iterable` of :obj:`str`
+            partcodes whose files are checked for changes in place
+
+        Returns
+        -------
+        changed : :obj:`set` of :obj:`str`
+            partcodes that were added, removed or modified
+        """
+        changed = set()
+        sections = {}
+        for section in self._section_dirs():
+            try:
+                mtime = os.stat(section).st_mtime
+            except OSError:
+                continue
+            old = self.sections.get(section)
+            if old is not None and old['mtime'] == mtime:
+                sections[section] = old
+                continue
+            files = self._list_section(section)
+            old_files = old['files'] if old is not None else {}
+            changed.update(_diff(old_files, files))
+            sections[section] = {'mtime': mtime, 'files': files}
+
+        for section in self.sections.keys() - sections.keys():
+            changed.update(_diff(self.sections[section]['files'], {}))
+
+        for partcode in partcodes:
+            for filetype in FILETYPES:
+                for path in self.lookup(partcode, filetype):
+                    entry = sections.get(str(path.parent))
+                    if entry is None or entry is not self.sections.get(
+                            str(path.parent)):
+                        continue  # listed again above
+                    try:
+                        mtime = os.stat(str(path)).st_mtime
+                    except OSError:
+                        continue
+                    if entry['files'].get(path.name) != mtime:
+                        entry['files'][path.name] = mtime
+                        changed.add(path.stem)
+
+        self.sections = sections
+        self._build_lookup()
+        return changed
+
+    def lookup(self, partcode, filetype):
+        """find file paths, ignoring the case of the partcode and file type
+
+        Only files in the partcode's own 'project/section' folder, e.g.
+        '*/AGR1316/010/' for 'AGR1316-010-00', are returned. Copies found
+        anywhere else are reported by 'conflicts'.
+
+        Parameters
+        ----------
+        partcode : str
+            AGR part number usually in 'AGR0000-000-00' format
+        filetype : str
+            file type ('ipt', 'iam', 'idw' or 'dwg')
+
+        Returns
+        -------
+        Path : :obj:`list` of obj
+            Path objects from Python pathlib module, empty if not found
+        """
+        return self._lookup.get((partcode.lower(), filetype.lower()), [])
+
+    def conflicts(self):
+        """Duplicate and misplaced partcodes
+
+        Returns
+        -------
+        conflicts : dict
+            (partcode, filetype) -> list of Path objects, for every
+            partcode found in more than one place in the workspace or
+            outside its own 'project/section' folder
+        """
+        return {
+            (paths[0].stem, filetype): paths
+            for (_, filetype), paths in self._found.items()
+            if len(paths) > 1 or not _is_home(paths[0])
+        }
+
+    def _section_dirs(self):
+        """Yield every 'root/client/project/section' directory"""
+        for client in _subdirs(str(self.root)):
+            for project in _subdirs(client):
+                yield from _subdirs(project)
+
+    @staticmethod
+    def _list_section(section):
+        """Return {filename: mtime} of the indexed files in a section"""
+        files = {}
+        try:
+            entries = list(os.scandir(section))
+        except OSError:
+            return files
+        for entry in entries:
+            filetype = entry.name.rpartition('.')[2].lower()
+            if filetype in FILETYPES and entry.is_file():
+                files[entry.name] = entry.stat().st_mtime
+        return files
+
+    def _build_lookup(self):
+        found = {}
+        for section in sorted(self.sections):
+            for name in self.sections[section]['files']:
+                partcode, _, filetype = name.rpartition('.')
+                key = (partcode.lower(), filetype.lower())
+                found.setdefault(key, []).append(Path(section, name))
+        self._found = found
+        self._lookup = {}
+        for key, paths in found.items():
+            home = [path for path in paths if _is_home(path)]
+            if home:
+                self._lookup[key] = home
+
+
+def _is_home(path):
+    """bool: is the file in its partcode's own 'project/section' folder?"""
+    partcode = path.stem.lower()
+    return (path.parent.parent.name.lower() == partcode[0:7]
+            and path.parent.name.lower() == partcode[8:11])
+
+
+def _subdirs(directory):
+    """Return the sub directory paths of a directory"""
+    try:
+        return [e.path for e in os.scandir(directory) if e.is_dir()]
+    except OSError:
+        return []
+
+
+def _diff(old, new):
+    """Return the partcodes whose files differ between two listings"""
+    names = {
+        name for name in old.keys() | new.keys()
+        if old.get(name) != new.get(name)
+    }
+    return {name.rpartition('.')[0] for name in names}
@@ -1,12 +1,81 @@
 """
 Inventor COM API
+
+win32com is imported when the first COM call is made, not at import time.
 """
 
-from system import EXPORT_DIR, start_inventor
-import win32com.client
+from system import EXPORT_DIR, start_inventor, inventor_failed
+from manifest import info_cache
+from contextlib import contextmanager
+
+import backend
+import timing
+
+import time
+
+
+# drawing info key -> (iProperty name, type)
+DRAWING_PROPERTIES = {
+    'partcode': ('Dwg_No', str),
+    'rev': ('Revision', int),
+    'desc': ('Component', str),
+    'material': ('Material', str),
+    'finish': ('Finish', str),
+}
+
+# COM call name -> [calls, seconds]
+COM_TIMINGS = {}
+
+@contextmanager
+def com_timer(name):
+    """Time a COM call
+
+    Add the call and its duration to COM_TIMINGS under 'name', and to the
+    run's stage timings as 'com.<name>' when timing is enabled.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        totals = COM_TIMINGS.setdefault(name, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+        timing.add('com.' + name, seconds)
+
+
+def read_properties(property_set, names):
+    """Read iProperties in one pass
+
+    Enumerate the property set once, keeping the values of the requested
+    properties, and stop as soon as all of them have been seen.
 
+    Parameters
+    ----------
+    property_set : obj
+        Inventor PropertySet COM Object
+    names : :obj:`list` of :obj:`str`
+        iProperty names
 
-class Document:
+    Returns
+    -------
+    values : dict
+        iProperty name -> value, None for properties not in the set
+    """
+    wanted = set(names)
+    values = dict.fromkeys(names)
+    with com_timer('PropertySet.enumerate'):
+        for prop in property_set:
+            name = prop.Name
+            if name in wanted:
+                values[name] = prop.Value
+                wanted.discard(name)
+                if not wanted:
+                    break
+    return values
+
+
+class Document(backend.Document):
     """Document
 
     The Document base class contains methods and properties for Inventor's
@@ -25,6 +94,9 @@ class Document:
     ----------
     path : obj
         Path Object from python pathlib module
+    source : obj
+        Path object of the workspace file, 'path' unless opened from a
+        staged copy
     app : obj
         Inventor Application COM Object
     doc : obj
@@ -38,14 +110,31 @@ class Document:
         self.doc = self._load_document(path, app)
         self.export_dir = export_dir
         self.path = path
+        self.source = path
         print(self.doc)
         print(self.export_dir)
         print(str(self.path))
 
-    @property
-    def partcode(self):
-        """str: return the file's partcode from it's full path"""
-        return self.path.stem
+    def get_properties(self, names, set_name='Inventor User Defined Properties'):
+        """iProperties
+
+        Read any list of iProperties from one property set in one pass.
+
+        Parameters
+        ----------
+        names : :obj:`list` of :obj:`str`
+            iProperty names
+        set_name : str
+            property set name
+
+        Returns
+        -------
+        values : dict
+            iProperty name -> value, None for missing properties
+        """
+        with com_timer('PropertySets.Item'):
+            property_set = self.doc.PropertySets.Item(set_name)
+        return read_properties(property_set, names)
 
     @staticmethod
     def _load_document(path, app):
@@ -67,7 +156,8 @@ class Document:
         obj
             Inventor Document COM Object
         """
-        start_inventor()
+        import win32com.client
+        start_inventor(_is_registered)
         document_type_enum = {
             12289: 'UnnownDocument',
             12290: 'PartDocument',
@@ -80,13 +170,15 @@ class Document:
             12297: 'NoDocument',
         }
         try:
-            app.Documents.Open(str(path))
+            with com_timer('Documents.Open'):
+                app.Documents.Open(str(path))
             document_type = document_type_enum[app.ActiveDocumentType]
             doc = win32com.client.CastTo(app.ActiveDocument, document_type)
             print(doc, document_type)
             return doc
         except:
             print('unable to load file')
+            inventor_failed()
             return None
 
     def export_to(self, subdir, filetype='pdf'):
@@ -100,22 +192,34 @@ class Document:
         subdir: str
             Sub directory for exported file.
         filetype: str
-            Inventor supported file format
+            Inventor supported file format, or a list of them to export
+            each from this one open
+
+        Returns
+        -------
+        Path : obj
+            Path object of the exported file, a list of them for a list of
+            file formats
         """
+        if not isinstance(filetype, str):
+            return [self.export_to(subdir, f) for f in filetype]
         file = self.partcode + '.' + filetype
         path = self.export_dir.joinpath(subdir).joinpath(file)
         print(str(path))
-        self.doc.SaveAs(str(path), True)
+        with com_timer('SaveAs'):
+            self.doc.SaveAs(str(path), True)
+        return path
 
     def close(self):
         """Close Document
 
         Close current Inventor document without saving.
         """
-        self.doc.Close(SkipSave=True)
+        with com_timer('Close'):
+            self.doc.Close(SkipSave=True)
 
 
-class Drawing(Document):
+class Drawing(Document, backend.Drawing):
     """Drawing Document
 
     The Drawing Class contains methods and properties for Inventor's
@@ -130,54 +234,74 @@ class Drawing(Document):
         drawing_sheet_size_enum = {
             9993: 'A0', 9994: 'A1', 9995: 'A2', 9996: 'A3', 9997: 'A4'
         }
-        return drawing_sheet_size_enum[self.doc.Sheets(1).Size]
+        with com_timer('Sheets.Size'):
+            size = self.doc.Sheets(1).Size
+        return drawing_sheet_size_enum[size]
 
-    def get_drawing_info(self):
+    def get_drawing_info(self, use_cache=True, properties=DRAWING_PROPERTIES):
         """Drawing Infomation
 
-        Return a dictionary of the drawing's properties.
+        Return a dictionary of the drawing's properties. The drawing info
+        cache is consulted first and updated after reading the document.
+        All iProperties are read in one pass over the property set.
+
+        Parameters
+        ----------
+        use_cache : bool
+            return the cached drawing info if the file is unchanged
+        properties : dict
+            drawing info key -> (iProperty name, type)
         """
-        iprop = self.doc.PropertySets.Item("Inventor User Defined Properties")
-        drawing_info = {
-            'partcode': str(iprop.Item('Dwg_No')),
-            'rev': int(iprop.Item('Revision')),
-            'desc': str(iprop.Item('Component')),
-            'material': str(iprop.Item('Material')),
-            'finish': str(iprop.Item('Finish')),
-            'size': self.get_drawing_sheet_size()
-        }
+        cache = info_cache()
+        if use_cache and cache.is_fresh(self.source):
+            return cache.drawing_info(self.source)
+        values = self.get_properties([name for name, _ in properties.values()])
+        drawing_info = {}
+        for key, (name, convert) in properties.items():
+            value = values[name]
+            drawing_info[key] = None if value is None else convert(value)
+        drawing_info['size'] = self.get_drawing_sheet_size()
+        cache.record(self.source, drawing_info, [])
         return drawing_info
 
     def export_part_list(self, filetype='xlsx'):
         """Part List
 
-        Export the drawings part list to an excel spreadsheet.
+        Export the drawings part list to an excel spreadsheet or csv file.
         """
         if filetype == 'csv':
             enum = 48649
         else:
             enum = 48642
-        path = self.export_dir.joinpath(self.partcode).joinpath('part_list.xlsx')
+        file = 'part_list.' + filetype
+        path = self.export_dir.joinpath(self.partcode).joinpath(file)
         self.doc.Sheets(1).PartsLists(1).Export(str(path), enum)
+        return path
 
 
-class Assembly(Document):
+class Assembly(Document, backend.Assembly):
     """Assembly Document
 
     The Assembly Class contains methods and properties for Inventor's
     AssemblyDocument COM object. Used to query iam file.
     """
 
-    def export_bom(self):
+    def export_bom(self, filetype='xlsx'):
         """Assembly BOM
 
-        Export the assembly's bom to an excel spreadsheet.
+        Export the assembly's bom to an excel spreadsheet or csv file.
         """
-        path = self.export_dir.joinpath(self.partcode).joinpath('bom.xlsx')
+        if filetype == 'csv':
+            enum = 74502
+        else:
+            enum = 74498
+        file = 'bom.' + filetype
+        path = self.export_dir.joinpath(self.partcode).joinpath(file)
         bom = self.doc.ComponentDefinition.BOM
         bom.StructuredViewFirstLevelOnly = False
         bom.StructuredViewEnabled = True
-        bom.BOMViews.Item("Structured").Export(path, 74498)
+        bom.BOMViews.Item("Structured").Export(str(path), enum)
+        return path
 
 
 class Part(Document):
@@ -189,7 +313,40 @@ class Part(Document):
     pass
 
 
-def application(silent=True, visible=True):
+def _is_registered():
+    """bool: has Inventor registered its COM object yet?"""
+    import win32com.client
+    try:
+        win32com.client.GetActiveObject('Inventor.Application')
+    except Exception:
+        return False
+    return True
+
+
+def process_id(app):
+    """Process ID of an Inventor session
+
+    Found from the window handle of its main frame, so a session that
+    stops responding to COM can still be killed.
+
+    Parameters
+    ----------
+    app : obj
+        Inventor Application COM Object
+
+    Returns
+    -------
+    int
+        process ID, or None if it cannot be found
+    """
+    import win32process
+    try:
+        return win32process.GetWindowThreadProcessId(app.MainFrameHWND)[1]
+    except Exception:
+        return None
+
+
+def application(silent=True, visible=True, new_instance=False):
     """Inventor Application COM Object
 
     Start COM client session with Inventor, and create object 'mod' that will
@@ -202,15 +359,22 @@ def application(silent=True, visible=True):
         controls whether an operation will proceed without prompting
     visible : bool
         sets the visibility of this application
+    new_instance : bool
+        start a separate Inventor process instead of attaching to the
+        running one. Used by the worker pool, one session per worker.
 
     Returns
     -------
     obj
         Inventor Application COM Object
     """
+    import win32com.client
     mod = win32com.client.gencache.EnsureModule(
         '{D98A091D-3A0F-4C3E-B36E-61F62068D488}', 0, 1, 0)
-    app = win32com.client.Dispatch('Inventor.Application')
+    if new_instance:
+        app = win32com.client.DispatchEx('Inventor.Application')
+    else:
+        app = win32com.client.Dispatch('Inventor.Application')
     app = mod.Application.Application(app)
     app.SilentOperation = silent
     app.Visible = visible
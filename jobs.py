@@ -0,0 +1,238 @@
+"""
+Job Queue
+
+Export requests are saved as command lines in a SQLite database, so
+anyone on the workstation can queue work while one long-lived worker
+runs it in a warm Inventor session.
+"""
+
+from pathlib import Path
+
+import sqlite3
+import json
+import time
+import os
+
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    command TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority, id);
+"""
+
+
+class JobQueue:
+    """Job Queue
+
+    Each job is a command line for 'main.run', e.g.
+    ['batch', 'AGR0000-000-00']. Pending jobs are run highest priority
+    first, then oldest first. Queueing a command that is already pending
+    returns the pending job instead of adding another one.
+
+    Parameters
+    ----------
+    path : obj
+        Path object of the SQLite database, created if missing
+
+    Attributes
+    ----------
+    path : obj
+        Path object of the SQLite database
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        os.makedirs(str(self.path.parent), exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
+
+    def _transaction(self):
+        """Start a write transaction, so claims and inserts never race"""
+        self._conn.execute('BEGIN IMMEDIATE')
+
+    def enqueue(self, command, priority=0):
+        """Queue a command
+
+        Parameters
+        ----------
+        command : :obj:`list` of :obj:`str`
+            command line arguments for 'main.run'
+        priority : int
+            higher runs first. Queueing a pending command again raises its
+            priority if the new one is higher.
+
+        Returns
+        -------
+        id : int
+            job id
+        added : bool
+            False if the command was already pending
+        """
+        text = json.dumps(list(command))
+        self._transaction()
+        try:
+            row = self._conn.execute(
+                'SELECT id, priority FROM jobs WHERE command = ? AND status = ?',
+                (text, PENDING)).fetchone()
+            if row is not None:
+                if priority > row['priority']:
+                    self._conn.execute(
+                        'UPDATE jobs SET priority = ? WHERE id = ?',
+                        (priority, row['id']))
+                self._conn.execute('COMMIT')
+                return row['id'], False
+            cursor = self._conn.execute(
+                'INSERT INTO jobs (command, priority, status, created) '
+                'VALUES (?, ?, ?, ?)', (text, priority, PENDING, time.time()))
+            self._conn.execute('COMMIT')
+            return cursor.lastrowid, True
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+
+    def claim(self):
+        """Take the next pending job and mark it running
+
+        Returns
+        -------
+        job : dict
+            the job, see 'get', or None if nothing is pending
+        """
+        self._transaction()
+        try:
+            row = self._conn.execute(
+                'SELECT id FROM jobs WHERE status = ? '
+                'ORDER BY priority DESC, id LIMIT 1', (PENDING,)).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    'UPDATE jobs SET status = ?, started = ? WHERE id = ?',
+                    (RUNNING, time.time(), row['id']))
+            self._conn.execute('COMMIT')
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        return None if row is None else self.get(row['id'])
+
+    def finish(self, job_id, ok, message=''):
+        """Mark a running job done or failed
+
+        Parameters
+        ----------
+        job_id : int
+            job id
+        ok : bool
+            did the job succeed?
+        message : str
+            result shown by 'status'
+        """
+        self._conn.execute(
+            'UPDATE jobs SET status = ?, finished = ?, message = ? WHERE id = ?',
+            (DONE if ok else FAILED, time.time(), message, job_id))
+
+    def requeue_running(self):
+        """Put jobs left running by a worker that died back in the queue
+
+        Only call this when no other worker is running.
+
+        Returns
+        -------
+        int
+            number of jobs requeued
+        """
+        cursor = self._conn.execute(
+            'UPDATE jobs SET status = ?, started = NULL WHERE status = ?',
+            (PENDING, RUNNING))
+        return cursor.rowcount
+
+    def get(self, job_id):
+        """One job
+
+        Returns
+        -------
+        job : dict
+            'id', 'command', 'priority', 'status', 'created', 'started',
+            'finished' and 'message', or None if there is no such job
+        """
+        row = self._conn.execute(
+            'SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return None if row is None else _job(row)
+
+    def jobs(self, statuses=(PENDING, RUNNING)):
+        """Jobs with the given statuses: running, then pending in the order
+        they will run, then finished
+
+        Parameters
+        ----------
+        statuses : :obj:`tuple` of :obj:`str`
+            statuses to list
+
+        Returns
+        -------
+        jobs : :obj:`list` of dict
+            jobs, see 'get'
+        """
+        marks = ', '.join('?' * len(statuses))
+        sql = ('SELECT * FROM jobs WHERE status IN ({}) '
+               'ORDER BY status = ? DESC, status = ? DESC, priority DESC, id'
+               .format(marks))
+        rows = self._conn.execute(
+            sql, (*statuses, RUNNING, PENDING)).fetchall()
+        return [_job(row) for row in rows]
+
+
+def _job(row):
+    job = dict(row)
+    job['command'] = json.loads(job['command'])
+    return job
+
+
+def work(queue, run, poll=2.0, once=False):
+    """Worker loop
+
+    Claim and run jobs until interrupted, waiting 'poll' seconds whenever
+    the queue is empty.
+
+    Parameters
+    ----------
+    queue : obj
+        JobQueue
+    run : function
+        'run(command)' runs one job and returns its exit status
+    poll : float
+        seconds between checks of an empty queue
+    once : bool
+        return as soon as the queue is empty
+    """
+    while True:
+        job = queue.claim()
+        if job is None:
+            if once:
+                return
+            time.sleep(poll)
+            continue
+        print('>>> job {}: {}'.format(job['id'], ' '.join(job['command'])))
+        try:
+            status = run(job['command'])
+        except (Exception, SystemExit) as e:
+            queue.finish(job['id'], False, repr(e))
+            continue
+        queue.finish(job['id'], status == 0, 'exit status {}'.format(status))
@@ -0,0 +1,93 @@
+"""
+Run Journal
+"""
+
+from pathlib import Path
+
+import json
+import os
+
+
+class Journal:
+    """Run Journal
+
+    Append-only JSON lines log of every drawing completed in a batch
+    export run, kept as 'journal.jsonl' in the assembly's export folder.
+    Each line is flushed to disk before the next drawing is opened, so an
+    interrupted run can be resumed and its drawing info rebuilt.
+
+    Parameters
+    ----------
+    path : obj
+        Path object of the journal file
+
+    Attributes
+    ----------
+    path : obj
+        Path object of the journal file
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def exists(self):
+        """bool: has a run been journaled?"""
+        return self.path.exists()
+
+    def clear(self):
+        """Start a new run"""
+        with open(str(self.path), 'w'):
+            pass
+
+    def append(self, source, drawing_info, outputs):
+        """Record a completed drawing
+
+        Parameters
+        ----------
+        source : obj
+            Path object of the source file
+        drawing_info : dict
+            Drawing information, None for files without one
+        outputs : :obj:`list` of obj
+            Path objects of every file produced from the source
+        """
+        record = {
+            'source': str(source),
+            'drawing_info': drawing_info,
+            'outputs': [str(output) for output in outputs],
+        }
+        with open(str(self.path), 'a') as file:
+            file.write(json.dumps(record) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+    def records(self):
+        """Latest record of each source file, in the order first completed
+
+        A partially written last line, left by a crash mid-write, is
+        ignored.
+
+        Returns
+        -------
+        records : dict
+            source path -> {'source', 'drawing_info', 'outputs'}
+        """
+        records = {}
+        try:
+            with open(str(self.path)) as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    records[record['source']] = record
+        except OSError:
+            pass
+        return records
+
+    def drawing_info(self):
+        """:obj:`list` of dict: drawing info of every completed drawing"""
+        return [
+            record['drawing_info'] for record in self.records().values()
+            if record['drawing_info'] is not None
+        ]
@@ -2,7 +2,17 @@
 User Interface
 """
 
+import backend
+import system
+import timing
 import core
+import plan as planner
+import watch
+
+import argparse
+import shlex
+import time
+import sys
 
 
 def title():
@@ -23,8 +33,15 @@ def title():
     )
 
 
-def main_ui():
-    print(
+def main_ui(session=None):
+    """Interactive menu
+
+    A thin layer over the command line: each option builds the same
+    arguments 'python -m main' takes and runs them in a shared session.
+    """
+    if session is None:
+        session = backend.Session()
+    menu = (
         """
         Welcome!
 
@@ -47,117 +64,484 @@ def main_ui():
         q) quit
         """
     )
+    options = {
+        '1': batch_export_ui,
+        '2': batch_export_from_ui,
+        '3': export_to_ui,
+        '4': cnc_batch_export_ui,
+        '5': cnc_export_to_ui,
+    }
 
+    print(menu)
     while True:
         user_input = input('Export: ')
-        if user_input == '1':
-            batch_export_ui()
-        elif user_input == '2':
-            batch_export_from_ui()
-        elif user_input == '3':
-            export_to_ui()
-        elif user_input == '4':
-            cnc_batch_export_ui()
-        elif user_input == '5':
-            cnc_export_to()
+        if user_input in options:
+            options[user_input](session)
+            print(menu)
         elif user_input == 'q' or user_input == 'quit':
-            exit()
+            sys.exit()
         else:
             print('Please enter a valid option')
 
 
-def batch_export_ui():
-    print("    Please enter an assembly number you want to export.")
-    print("    Enter 'b' to go back")
-    print("    Enter 'q' to quit\n")
+def _prompt(message, required=False):
+    """Ask for input, return None to go back and exit on quit. Ask again
+    on empty input if required."""
     while True:
-        user_input = input('Batch export: ')
+        user_input = input(message)
         if user_input == 'b' or user_input == 'back':
-            main_ui()
-        elif user_input == 'q' or user_input == 'quit':
-            exit()
-        else:
-            core.batch_export(user_input)
+            return None
+        if user_input == 'q' or user_input == 'quit':
+            sys.exit()
+        if user_input or not required:
+            return user_input
+        print('Please enter a value')
+
+
+def _run(argv, session):
+    """Run a command from the menu, staying in the menu if argparse
+    rejects it"""
+    try:
+        run(argv, session)
+    except SystemExit:
+        pass
 
 
-def batch_export_from_ui():
-    print("    Please enter the file name with the list of partcodes you want to export.")
+def _print_help(message):
+    print("    " + message)
     print("    Enter 'b' to go back")
     print("    Enter 'q' to quit\n")
+
+
+def batch_export_ui(session):
+    _print_help("Please enter an assembly number you want to export.")
+    while True:
+        assembly = _prompt('Batch export: ', required=True)
+        if assembly is None:
+            return
+        _run(['batch', assembly], session)
+
+
+def batch_export_from_ui(session):
     while True:
-        filename = input('File: ')
+        _print_help("Please enter the file name with the list of partcodes you want to export.")
+        filename = _prompt('File: ')
+        if filename is None:
+            return
         if filename == '':
             filename = 'export.txt'
-        if filename == 'b' or filename == 'back':
-            main_ui()
-        elif filename == 'q' or filename == 'quit':
-            exit()
-        else:
-            print("    Please enter the file format you want to convert to.")
-            print("    Enter 'b' to go back")
-            print("    Enter 'q' to quit\n")
-            filetype = input('File format: ')
-            if filetype == 'b' or filetype == 'back':
-                main_ui()
-            elif filetype == 'q' or filetype == 'quit':
-                exit()
-            else:
-                core.batch_export_from(filename, filetype)
+        _print_help("Please enter the file formats you want to convert to, "
+                    "separated by spaces.")
+        filetypes = _prompt('File formats: ', required=True)
+        if filetypes is None:
+            return
+        _run(['export-from', filename, *filetypes.split()], session)
 
 
-def export_to_ui():
-    print("    Please enter the drawing number you want to export.")
-    print("    Enter 'b' to go back")
-    print("    Enter 'q' to quit\n")
+def export_to_ui(session):
     while True:
-        partcode = input('Export: ')
-        if partcode == 'b' or partcode == 'back':
-            main_ui()
-        elif partcode == 'q' or partcode == 'quit':
-            exit()
-        else:
-            print("    Please enter the file format you want to convert to.")
-            print("    Enter 'b' to go back")
-            print("    Enter 'q' to quit\n")
-            filetype = input('File format: ')
-            if filetype == 'b' or filetype == 'back':
-                main_ui()
-            elif filetype == 'q' or filetype == 'quit':
-                exit()
-            else:
-                core.export_to(partcode, filetype)
+        _print_help("Please enter the drawing number you want to export.")
+        partcode = _prompt('Export: ', required=True)
+        if partcode is None:
+            return
+        _print_help("Please enter the file formats you want to convert to, "
+                    "separated by spaces.")
+        filetypes = _prompt('File formats: ', required=True)
+        if filetypes is None:
+            return
+        _run(['export', partcode, *filetypes.split()], session)
 
 
-def cnc_batch_export_ui():
-    print("    Please enter the file name with the list of partcodes you want to export.")
-    print("    Enter 'b' to go back")
-    print("    Enter 'q' to quit\n")
+def cnc_batch_export_ui(session):
+    _print_help("Please enter the file name with the list of partcodes you want to export.")
     while True:
-        filename = input('File: ')
+        filename = _prompt('File: ')
+        if filename is None:
+            return
         if filename == '':
             filename = 'export.txt'
-        if filename == 'b' or filename == 'back':
-            main_ui()
-        elif filename == 'q' or filename == 'quit':
-            exit()
-        else:
-            core.cnc_batch_export_from(filename)
+        _run(['cnc-from', filename], session)
 
 
-def cnc_export_to():
-    print("    Please enter the drawing number you want to export.")
-    print("    Enter 'b' to go back")
-    print("    Enter 'q' to quit\n")
+def cnc_export_to_ui(session):
+    _print_help("Please enter the drawing number you want to export.")
     while True:
-        partcode = input('Export: ')
-        if partcode == 'b' or partcode == 'back':
-            main_ui()
-        elif partcode == 'q' or partcode == 'quit':
-            exit()
+        partcode = _prompt('Export: ', required=True)
+        if partcode is None:
+            return
+        _run(['cnc', partcode], session)
+
+
+def build_parser():
+    """argparse.ArgumentParser: command line interface"""
+    parser = argparse.ArgumentParser(
+        prog='python -m main',
+        description='Publish drawings from Autodesk Inventor. '
+                    'Run without a command for the interactive menu.')
+    parser.add_argument('--backend', choices=sorted(backend.BACKENDS),
+                        help='CAD backend, "fake" runs without Inventor '
+                             '(default inventor)')
+    parser.add_argument('--timing', action='store_true',
+                        help='save a per-stage timing report of the run')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    p = commands.add_parser('batch', help='batch export assemblies')
+    p.add_argument('assemblies', nargs='+', metavar='assembly')
+    p.add_argument('--workers', type=int, default=1,
+                   help='number of Inventor sessions for the parts')
+    p.add_argument('--force', action='store_true',
+                   help='export unchanged drawings as well')
+    p.add_argument('--no-report', dest='report', action='store_false',
+                   help='skip the Excel report')
+    p.add_argument('--recursive', action='store_true',
+                   help='include the drawings of every sub-assembly')
+    p.add_argument('--plan', help='use a plan saved by the plan command')
+    p.add_argument('--no-print-sets', dest='print_sets', action='store_false',
+                   help='skip merging the print folders')
+
+    p = commands.add_parser('resume', help='resume interrupted batch exports')
+    p.add_argument('assemblies', nargs='+', metavar='assembly')
+    p.add_argument('--workers', type=int, default=1,
+                   help='number of Inventor sessions for the parts')
+    p.add_argument('--no-report', dest='report', action='store_false',
+                   help='skip the Excel report')
+    p.add_argument('--no-print-sets', dest='print_sets', action='store_false',
+                   help='skip merging the print folders')
+
+    p = commands.add_parser(
+        'print-sets', help='merge the print folders into one pdf per size')
+    p.add_argument('assemblies', nargs='+', metavar='assembly')
+    p.add_argument('--force', action='store_true',
+                   help='merge unchanged print sets as well')
+
+    p = commands.add_parser(
+        'report', help='drawing info report without exporting')
+    p.add_argument('assemblies', nargs='+', metavar='assembly')
+
+    p = commands.add_parser(
+        'export-from', help='export the partcodes listed in a file')
+    p.add_argument('filename')
+    p.add_argument('filetypes', nargs='+', metavar='filetype')
+    p.add_argument('--plan', help='use a plan saved by the plan command')
+
+    p = commands.add_parser('export', help='export one partcode')
+    p.add_argument('partcode')
+    p.add_argument('filetypes', nargs='+', metavar='filetype')
+
+    p = commands.add_parser(
+        'cnc-from', help='export dxf files listed in a file to the CNC drive')
+    p.add_argument('filename')
+    p.add_argument('--target', help='CNC folder, default ' + str(system.CNC_DIR))
+
+    p = commands.add_parser('cnc', help='export dxf files to the CNC drive')
+    p.add_argument('partcodes', nargs='+', metavar='partcode')
+    p.add_argument('--target', help='CNC folder, default ' + str(system.CNC_DIR))
+
+    p = commands.add_parser(
+        'jobs', help='run every command in a job file, one per line')
+    p.add_argument('jobfile')
+
+    p = commands.add_parser(
+        'watch', help='re-export drawings as they change in the workspace')
+    p.add_argument('--interval', type=float, default=5.0,
+                   help='seconds between checks of the workspace')
+    p.add_argument('--quiet', type=float, default=10.0,
+                   help='seconds without changes before exporting')
+    p.add_argument('--recursive', action='store_true',
+                   help='include sub-assemblies when a bom changes')
+    p.add_argument('--no-report', dest='report', action='store_false',
+                   help='skip the Excel report')
+
+    p = commands.add_parser(
+        'plan', help='show what a batch or export-from command would do')
+    p.add_argument('--save', help='save the plan to a json file')
+    p.add_argument('job', nargs=argparse.REMAINDER,
+                   help='command to plan, e.g. batch AGR0000-000-00')
+
+    p = commands.add_parser('enqueue', help='queue a command for the worker')
+    p.add_argument('--priority', type=int, default=0,
+                   help='higher priority jobs run first')
+    p.add_argument('job', nargs=argparse.REMAINDER,
+                   help='command to run, e.g. batch AGR0000-000-00')
+
+    p = commands.add_parser(
+        'worker', help='run queued commands in one Inventor session')
+    p.add_argument('--once', action='store_true',
+                   help='stop when the queue is empty')
+    p.add_argument('--poll', type=float, default=2.0,
+                   help='seconds between checks of an empty queue')
+
+    p = commands.add_parser('status', help='list queued commands')
+    p.add_argument('ids', nargs='*', type=int, metavar='id')
+    p.add_argument('--all', action='store_true',
+                   help='include finished commands')
+    return parser
+
+
+QUEUE_COMMANDS = ('enqueue', 'worker', 'status')
+
+# commands refused in job files and by enqueue: they run no export, or
+# like watch never return
+NOT_JOBS = (None, 'jobs', 'watch', 'plan') + QUEUE_COMMANDS
+
+
+def _jobs(args, parser):
+    """Expand parsed arguments into jobs
+
+    Returns
+    -------
+    jobs : :obj:`list` of :obj:`tuple`
+        (label, function, keyword arguments) for each job
+    """
+    if args.command == 'batch':
+        return [
+            ('batch ' + assembly, core.batch_export,
+             {'assembly': assembly, 'workers': args.workers,
+              'force': args.force, 'report': args.report,
+              'recursive': args.recursive, 'print_sets': args.print_sets,
+              'plan': _load_plan(args, 'batch', assembly)})
+            for assembly in args.assemblies
+        ]
+    if args.command == 'resume':
+        return [
+            ('resume ' + assembly, core.resume,
+             {'assembly': assembly, 'workers': args.workers,
+              'report': args.report, 'print_sets': args.print_sets})
+            for assembly in args.assemblies
+        ]
+    if args.command == 'print-sets':
+        return [
+            ('print-sets ' + assembly, core.build_print_sets,
+             {'assembly': assembly, 'force': args.force})
+            for assembly in args.assemblies
+        ]
+    if args.command == 'report':
+        return [
+            ('report ' + assembly, core.report_drawing_info,
+             {'assembly': assembly})
+            for assembly in args.assemblies
+        ]
+    if args.command == 'export-from':
+        return [(
+            'export-from ' + args.filename, core.batch_export_from,
+            {'filename': args.filename, 'filetypes': args.filetypes,
+             'plan': _load_plan(args, 'export-from', args.filename)})]
+    if args.command == 'export':
+        return [(
+            'export ' + args.partcode, core.export_to,
+            {'partcode': args.partcode, 'filetypes': args.filetypes})]
+    if args.command == 'cnc-from':
+        return [(
+            'cnc-from ' + args.filename, core.cnc_batch_export_from,
+            {'filename': args.filename, 'target': args.target})]
+    if args.command == 'cnc':
+        return [
+            ('cnc ' + partcode, core.cnc_export_to,
+             {'partcode': partcode, 'target': args.target})
+            for partcode in args.partcodes
+        ]
+    if args.command == 'watch':
+        return [(
+            'watch', watch.watch,
+            {'interval': args.interval, 'quiet': args.quiet,
+             'recursive': args.recursive, 'report': args.report})]
+    if args.command == 'jobs':
+        # parse the whole file first, so a typo fails before any export
+        jobs = []
+        with open(args.jobfile) as file:
+            for line in file:
+                line = line.split('#')[0].strip()
+                if not line:
+                    continue
+                job_args = parser.parse_args(shlex.split(line))
+                if job_args.command in NOT_JOBS:
+                    parser.error('invalid job: ' + line)
+                jobs += _jobs(job_args, parser)
+        return jobs
+    return []
+
+
+def run_jobs(jobs, session):
+    """Run jobs back-to-back in one session
+
+    A failing job is reported and the remaining jobs still run. A job
+    that returns per-partcode errors counts as failed. Each job is given
+    the session as its 'app', so Inventor is only started by the first
+    job that opens a document.
+
+    Returns
+    -------
+    int
+        exit status, 0 if every job succeeded, 1 otherwise
+    """
+    failed = []
+    for label, function, kwargs in jobs:
+        print('>>> ' + label)
+        try:
+            errors = function(app=session, **kwargs)
+        except Exception as e:
+            print('Failed - {}: {!r}'.format(label, e))
+            failed.append(label)
+            continue
+        if errors:
+            print('Failed - {}: {} partcode(s)'.format(label, len(errors)))
+            failed.append(label)
+    if len(jobs) > 1:
+        print('{} of {} jobs succeeded'.format(len(jobs) - len(failed), len(jobs)))
+    for label in failed:
+        print('    failed: ' + label)
+    return 1 if failed else 0
+
+
+def _load_plan(args, kind, target):
+    """dict: the saved plan given with --plan for a target, None if none"""
+    if args.plan is None:
+        return None
+    plan = planner.load(args.plan, kind, target)
+    if plan is None:
+        print('No plan for {} {} in {}'.format(kind, target, args.plan))
+    return plan
+
+
+def _plan(args, parser):
+    """Print the plan of a batch or export-from command, see plan.py
+
+    Returns
+    -------
+    int
+        exit status
+    """
+    job_args = parser.parse_args(args.job)
+    if job_args.command == 'batch':
+        plans = [
+            planner.plan_batch_export(
+                assembly, job_args.recursive, job_args.force)
+            for assembly in job_args.assemblies
+        ]
+    elif job_args.command == 'export-from':
+        plans = [planner.plan_batch_export_from(
+            job_args.filename, job_args.filetypes)]
+    else:
+        parser.error('only batch and export-from can be planned')
+    for plan in plans:
+        planner.summary(plan)
+    if args.save:
+        planner.save(plans, args.save)
+        print('Plan saved to ' + args.save)
+    return 0
+
+
+def _queue(args, parser, session=None):
+    """Run a job queue command, see jobs.py
+
+    Returns
+    -------
+    int
+        exit status
+    """
+    import jobs
+    queue = jobs.JobQueue(system.QUEUE_PATH)
+    try:
+        if args.command == 'enqueue':
+            job_args = parser.parse_args(args.job)
+            if job_args.command in NOT_JOBS:
+                parser.error('invalid job: ' + ' '.join(args.job))
+            command = list(args.job)
+            if args.timing:
+                command = ['--timing'] + command
+            if args.backend is not None:
+                command = ['--backend', args.backend] + command
+            job_id, added = queue.enqueue(command, args.priority)
+            if added:
+                print('Queued job {}'.format(job_id))
+            else:
+                print('Already queued as job {}'.format(job_id))
+            return 0
+
+        if args.command == 'worker':
+
+            def run_job(command):
+                status = run(command, session)
+                if status:
+                    session.reset()
+                return status
+
+            requeued = queue.requeue_running()
+            if requeued:
+                print('Requeued {} interrupted job(s)'.format(requeued))
+            jobs.work(queue, run_job, args.poll, args.once)
+            return 0
+
+        if args.ids:
+            found = [queue.get(job_id) for job_id in args.ids]
+        elif args.all:
+            found = queue.jobs(
+                (jobs.RUNNING, jobs.PENDING, jobs.DONE, jobs.FAILED))
         else:
-            core.cnc_export_to(partcode)
+            found = queue.jobs()
+        for job in found:
+            if job is None:
+                continue
+            print('{:>5} {:8} {:>4}  {}  {}'.format(
+                job['id'], job['status'], job['priority'],
+                ' '.join(job['command']), job['message'] or '').rstrip())
+        return 0
+    finally:
+        queue.close()
+
+
+def run(argv, session=None):
+    """Parse a command line and run it
+
+    Parameters
+    ----------
+    argv : :obj:`list` of :obj:`str`
+        command line arguments, without the program name
+    session : obj
+        backend.Session to run in, a new one on the --backend given if
+        not. Commands without --backend run on the session's backend.
+
+    Returns
+    -------
+    int
+        exit status
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if session is None:
+        session = backend.Session(args.backend)
+    # a worker runs many commands in one process, none may inherit the
+    # backend or timing of the one before
+    backend.use(args.backend or session.backend)
+    if args.command in QUEUE_COMMANDS:
+        return _queue(args, parser, session)
+    if args.command == 'plan':
+        return _plan(args, parser)
+    enabled = timing.ENABLED
+    if args.timing:
+        timing.enable()
+        timing.reset()
+    try:
+        status = run_jobs(_jobs(args, parser), session)
+        if args.timing:
+            name = 'timing_' + time.strftime('%Y%m%d_%H%M%S')
+            for path in timing.write_report(system.EXPORT_DIR.joinpath(name)):
+                print('Timing report saved to ' + str(path))
+    finally:
+        timing.enable(enabled)
+    return status
+
+
+def main(argv=None):
+    """Entry point for 'python -m main'"""
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        title()
+        main_ui()
+        return 0
+    return run(argv)
 
 
 if __name__ == '__main__':
-    title()
-    main_ui()
+    sys.exit(main())
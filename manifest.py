@@ -0,0 +1,178 @@
+"""
+Build Manifest
+"""
+
+from pathlib import Path
+
+import hashlib
+import json
+import os
+
+
+_info_cache = None
+
+
+def fingerprint(path):
+    """Source file fingerprint
+
+    Parameters
+    ----------
+    path : obj
+        Path object from python pathlib module
+
+    Returns
+    -------
+    dict
+        'mtime', 'size' and 'sha1' of the file
+    """
+    stat = os.stat(str(path))
+    return {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha1': file_hash(path)}
+
+
+def file_hash(path):
+    """str: sha1 hex digest of a file, read in 1MB chunks"""
+    sha1 = hashlib.sha1()
+    with open(str(path), 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class Manifest:
+    """Build Manifest
+
+    Record of what each source file produced the last time it was
+    exported, kept as 'manifest.json' in the assembly's export folder.
+    A source file is fresh when its mtime and size are unchanged, or its
+    content hash is unchanged, and all of its outputs still exist. A
+    drawing also records the model files it references, since its pdf
+    shows their geometry, and is only fresh while they are unchanged too.
+    Only files that are not fresh need to be opened again.
+
+    Parameters
+    ----------
+    path : obj
+        Path object of the manifest json file
+
+    Attributes
+    ----------
+    path : obj
+        Path object of the manifest json file
+    entries : dict
+        source path -> {'mtime', 'size', 'sha1', 'drawing_info', 'outputs',
+        'references'}, 'references' being path -> {'mtime', 'size', 'sha1'}
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+
+    def load(self):
+        """Load the manifest, an unreadable manifest is treated as empty"""
+        try:
+            with open(str(self.path)) as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+        return self
+
+    def save(self):
+        """Save the manifest"""
+        tmp = self.path.with_suffix('.tmp')
+        with open(str(tmp), 'w') as file:
+            json.dump(self.entries, file, indent=1)
+        os.replace(str(tmp), str(self.path))
+
+    def is_fresh(self, source, references=None):
+        """Is the source file unchanged with all of its outputs present?
+
+        Parameters
+        ----------
+        source : obj
+            Path object of the source file
+        references : :obj:`list` of obj
+            Path objects of the files the source references now. If given,
+            they must be the ones recorded and unchanged as well.
+
+        Returns
+        -------
+        bool
+        """
+        entry = self.entries.get(str(source))
+        if entry is None:
+            return False
+        if not all(os.path.exists(output) for output in entry['outputs']):
+            return False
+        if references is not None:
+            recorded = entry.get('references', {})
+            if set(recorded) != {str(path) for path in references}:
+                return False
+            if not all(_unchanged(path, recorded[path]) for path in recorded):
+                return False
+        return _unchanged(source, entry)
+
+    def drawing_info(self, source):
+        """dict: drawing info recorded for the source file"""
+        return self.entries[str(source)]['drawing_info']
+
+    def outputs(self, source):
+        """:obj:`list` of :obj:`str`: files recorded for the source file"""
+        return self.entries[str(source)]['outputs']
+
+    def record(self, source, drawing_info, outputs, references=()):
+        """Record an export
+
+        Parameters
+        ----------
+        source : obj
+            Path object of the source file
+        drawing_info : dict
+            Drawing information, None for files without one
+        outputs : :obj:`list` of obj
+            Path objects of every file produced from the source
+        references : :obj:`list` of obj
+            Path objects of the files the source references
+        """
+        entry = fingerprint(source)
+        entry['drawing_info'] = drawing_info
+        entry['outputs'] = [str(output) for output in outputs]
+        entry['references'] = {
+            str(path): fingerprint(path) for path in references}
+        self.entries[str(source)] = entry
+
+
+def _unchanged(path, entry):
+    """Does the file still match the 'mtime', 'size' and 'sha1' of entry?"""
+    try:
+        stat = os.stat(str(path))
+    except OSError:
+        return False
+    if stat.st_mtime == entry['mtime'] and stat.st_size == entry['size']:
+        return True
+    if stat.st_size != entry['size'] or file_hash(path) != entry['sha1']:
+        return False
+    # touched but unchanged, remember the new mtime so the next check
+    # does not need to hash the file again
+    entry['mtime'] = stat.st_mtime
+    return True
+
+
+def info_cache():
+    """Drawing information cache
+
+    Drawing info of every drawing read so far, keyed by its path and
+    checked against the file's mtime/size and content hash, so a drawing
+    that has not changed does not need to be opened to read it again.
+    Loaded from system.INFO_CACHE_PATH on first use, call
+    'info_cache().save()' to keep new entries.
+
+    Returns
+    -------
+    Manifest : obj
+        Build manifest used without outputs
+    """
+    global _info_cache
+    if _info_cache is None:
+        import system
+        _info_cache = Manifest(system.INFO_CACHE_PATH).load()
+    return _info_cache
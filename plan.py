@@ -0,0 +1,263 @@
+"""
+Export Plan
+
+Work out what a batch export would do - every source file, every output
+and which of them are already up to date - without starting Inventor or
+AutoCAD. A saved plan can be passed back to the export so the partcodes
+are not resolved again.
+"""
+
+import system
+import core
+import bom
+from manifest import info_cache
+from pathlib import Path
+
+import json
+import time
+
+
+# rough seconds to open, export and close one document
+COSTS = {'idw': 30.0, 'iam': 15.0, 'ipt': 20.0, 'dwg': 10.0}
+
+
+def _document(partcode, filetype, source, fresh, size, outputs):
+    return {
+        'partcode': partcode,
+        'filetype': filetype,
+        'source': str(source),
+        'fresh': fresh,
+        'size': size,
+        'outputs': [str(output) for output in outputs],
+    }
+
+
+def _drawing_info(manifest, path):
+    """Drawing info known without opening the drawing, or None"""
+    if manifest.is_fresh(path):
+        return manifest.drawing_info(path)
+    cache = info_cache()
+    if cache.is_fresh(path):
+        return cache.drawing_info(path)
+    return None
+
+
+def _drawing_outputs(assembly, partcode, drawing_info):
+    """Files '_export_inventer_drawing' writes for a drawing"""
+    pdf = system.EXPORT_DIR.joinpath(assembly + '/pdf/', partcode + '.pdf')
+    size = drawing_info['size'] if drawing_info else '?'
+    return [pdf, system.EXPORT_DIR.joinpath(
+        core._print_dir(assembly, size), partcode + '.pdf')]
+
+
+def plan_batch_export(assembly, recursive=False, force=False):
+    """Plan 'core.batch_export(assembly)'
+
+    The children come from the part list and bom exported by an earlier
+    run. Sub-assemblies that have not been exported yet are not expanded.
+
+    Parameters
+    ----------
+    assembly : str
+        AGR part number usually in 'AGR0000-000-00' format
+    recursive : bool
+        also plan the drawings under every sub-assembly
+    force : bool
+        plan to export every drawing, even the ones up to date
+
+    Returns
+    -------
+    plan : dict
+        'kind', 'target', 'created', 'recursive', 'children_known',
+        'partcodes', 'formats', 'paths', 'documents', 'missing' and
+        'estimate' (seconds)
+    """
+    manifest = core._load_manifest(assembly)
+    directory = system.EXPORT_DIR.joinpath(assembly)
+    children_known = bom.exported_children(directory) is not None
+    if recursive:
+        partcodes = bom.walk(assembly, core._load_children, core._is_assembly)
+    else:
+        partcodes = core._load_children(assembly)
+    formats = system.find_formats(partcodes)
+
+    paths = {}
+    documents = []
+    missing = []
+    index = system.get_index()
+
+    for filetype in ('idw', 'iam'):
+        path = system.find_path(assembly, filetype)
+        if path is None:
+            if assembly not in missing:
+                missing.append(assembly)
+            continue
+        paths.setdefault(assembly, {})[filetype] = str(path)
+        fresh = manifest.is_fresh(path, core._references(path))
+        if filetype == 'idw':
+            drawing_info = _drawing_info(manifest, path)
+            outputs = _drawing_outputs(assembly, assembly, drawing_info)
+            outputs.append(directory.joinpath('part_list.csv'))
+        else:
+            drawing_info = None
+            outputs = [directory.joinpath('bom.csv')]
+        size = drawing_info['size'] if drawing_info else None
+        documents.append(
+            _document(assembly, filetype, path, fresh, size, outputs))
+
+    for partcode in partcodes:
+        if not formats[partcode]:
+            missing.append(partcode)
+        for filetype in formats[partcode]:
+            found = index.lookup(partcode, filetype)
+            if found:
+                paths.setdefault(partcode, {})[filetype] = str(found[0])
+        if 'idw' in formats[partcode]:
+            path = paths[partcode]['idw']
+            drawing_info = _drawing_info(manifest, path)
+            outputs = _drawing_outputs(assembly, partcode, drawing_info)
+            size = drawing_info['size'] if drawing_info else None
+            fresh = manifest.is_fresh(path, core._references(Path(path)))
+            documents.append(_document(
+                partcode, 'idw', path, fresh, size, outputs))
+        if 'dwg' in formats[partcode]:
+            path = paths[partcode]['dwg']
+            outputs = [directory.joinpath('from_autocad', partcode + '.pdf')]
+            documents.append(_document(
+                partcode, 'dwg', path, manifest.is_fresh(path), None, outputs))
+
+    plan = {
+        'kind': 'batch',
+        'target': assembly,
+        'created': time.time(),
+        'recursive': recursive,
+        'children_known': children_known,
+        'partcodes': partcodes,
+        'formats': {p: sorted(types) for p, types in formats.items()},
+        'paths': paths,
+        'documents': documents,
+        'missing': missing,
+    }
+    if force:
+        for document in documents:
+            document['fresh'] = False
+    plan['estimate'] = estimate(plan)
+    return plan
+
+
+def plan_batch_export_from(filename, filetypes):
+    """Plan 'core.batch_export_from(filename, filetypes)'
+
+    Parameters
+    ----------
+    filename : str
+        file name in the export directory
+    filetypes : :obj:`list` of :obj:`str`
+        Inventor supported file formats
+
+    Returns
+    -------
+    plan : dict
+        'kind', 'target', 'created', 'filetypes', 'partcodes', 'paths',
+        'documents', 'missing' and 'estimate' (seconds)
+    """
+    if isinstance(filetypes, str):
+        filetypes = [filetypes]
+    with open(str(system.EXPORT_DIR.joinpath(filename))) as file:
+        partcodes = [line.strip() for line in file if line.strip()]
+
+    paths = {}
+    documents = []
+    missing = []
+    index = system.get_index()
+    for partcode in partcodes:
+        for source, formats in core._source_groups(filetypes):
+            found = index.lookup(partcode, source)
+            if not found:
+                if partcode not in missing:
+                    missing.append(partcode)
+                continue
+            paths.setdefault(partcode, {})[source] = str(found[0])
+            outputs = [system.EXPORT_DIR.joinpath(partcode + '.' + filetype)
+                       for filetype in formats]
+            documents.append(_document(
+                partcode, source, found[0], False, None, outputs))
+
+    plan = {
+        'kind': 'export-from',
+        'target': filename,
+        'created': time.time(),
+        'filetypes': filetypes,
+        'partcodes': partcodes,
+        'paths': paths,
+        'documents': documents,
+        'missing': missing,
+    }
+    plan['estimate'] = estimate(plan)
+    return plan
+
+
+def estimate(plan, costs=COSTS):
+    """float: estimated seconds to export the documents that are not fresh"""
+    return sum(costs.get(document['filetype'], 0.0)
+               for document in plan['documents'] if not document['fresh'])
+
+
+def summary(plan):
+    """Print what a plan will do and how long it should take"""
+    documents = plan['documents']
+    fresh = sum(1 for document in documents if document['fresh'])
+    outputs = sum(len(document['outputs']) for document in documents
+                  if not document['fresh'])
+    seconds = int(round(plan['estimate']))
+    print('{} {}'.format(plan['kind'], plan['target']))
+    print('    {} documents, {} up to date, {} to export ({} files)'.format(
+        len(documents), fresh, len(documents) - fresh, outputs))
+    print('    estimated time: {}:{:02d}:{:02d}'.format(
+        seconds // 3600, seconds // 60 % 60, seconds % 60))
+    if plan['missing']:
+        print('    {} partcodes not found:'.format(len(plan['missing'])))
+        for partcode in plan['missing']:
+            print('        ' + partcode)
+    if plan['kind'] == 'batch' and not plan['children_known']:
+        print('    the bom has not been exported yet, the parts cannot be '
+              'planned until the assembly has been exported')
+
+
+def save(plans, path):
+    """Save plans to a json file
+
+    Parameters
+    ----------
+    plans : :obj:`list` of dict
+        plans from 'plan_batch_export' or 'plan_batch_export_from'
+    path : str
+        json file name
+    """
+    with open(str(path), 'w') as file:
+        json.dump(plans, file, indent=1)
+
+
+def load(path, kind, target):
+    """Find a saved plan
+
+    Parameters
+    ----------
+    path : str
+        json file saved by 'save'
+    kind : str
+        'batch' or 'export-from'
+    target : str
+        assembly or file name the plan is for
+
+    Returns
+    -------
+    plan : dict
+        the plan, or None if the file has no plan for the target
+    """
+    with open(str(path)) as file:
+        plans = json.load(file)
+    for plan in plans:
+        if plan['kind'] == kind and plan['target'] == target:
+            return plan
+    return None
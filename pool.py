@@ -0,0 +1,190 @@
+"""
+Inventor Worker Pool
+"""
+
+import backend as backends
+
+import multiprocessing
+import signal
+import time
+import os
+
+
+STARTING = -2
+IDLE = -1
+
+
+def _worker(task, backend, jobs, results, current, since, pid):
+    """Worker process
+
+    Own one CAD session and run jobs off the shared queue until the
+    'None' sentinel is received. The job being run and the time it started
+    are written to shared memory before the COM calls are made, so the
+    parent can tell which job a hung or crashed worker was stuck on. The
+    process ID of the CAD session is shared too, so the parent can kill a
+    hung session along with its worker.
+
+    Parameters
+    ----------
+    task : function
+        module level function called as 'task(job, app, backend)'
+    backend : str
+        backend name, see backend.py
+    jobs : obj
+        multiprocessing queue of (index, job) tuples
+    results : obj
+        multiprocessing simple queue of (index, ok, value) tuples. Unlike
+        'Queue.put', 'SimpleQueue.put' has written the result by the time
+        it returns, so a crash in the next job cannot lose it.
+    current : obj
+        shared int, index of the running job, STARTING or IDLE
+    since : obj
+        shared float, time the current state was entered
+    pid : obj
+        shared int, process ID of the CAD session, 0 if unknown
+    """
+    module = backends.load(backend)
+    app = module.application(new_instance=True)
+    pid.value = module.process_id(app) or 0
+    since.value = time.time()
+    current.value = IDLE
+    while True:
+        item = jobs.get()
+        if item is None:
+            break
+        index, job = item
+        since.value = time.time()
+        current.value = index
+        try:
+            results.put((index, True, task(job, app, module)))
+        except Exception as e:
+            results.put((index, False, repr(e)))
+        current.value = IDLE
+    app.Quit()
+
+
+def _kill(pid):
+    """Kill the CAD session of a replaced worker, if it is still running"""
+    if not pid:
+        return
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except OSError:
+        pass
+
+
+def run(task, jobs, workers=2, backend='inventor', timeout=300, retries=1,
+        on_result=None):
+    """Run jobs across a pool of CAD sessions
+
+    Start 'workers' processes, each with its own CAD session, pulling from
+    a shared queue. A worker that dies, or spends more than 'timeout'
+    seconds on one job or on starting its session, is terminated and
+    replaced, along with its CAD session. The job it was running is
+    queued again up to 'retries' times before being reported as failed.
+
+    Parameters
+    ----------
+    task : function
+        module level function called as 'task(job, app, backend)'
+    jobs : list
+        picklable job descriptions
+    workers : int
+        number of worker processes
+    backend : str
+        backend name, see backend.py
+    timeout : float
+        seconds before a job is considered hung
+    retries : int
+        number of times a hung or crashed job is re-queued
+    on_result : function
+        called as 'on_result(index, value)' as soon as each job succeeds
+
+    Returns
+    -------
+    results : list
+        task return value for each job, in the order of 'jobs'
+    errors : dict
+        job index -> error message for the jobs that failed
+    """
+    ctx = multiprocessing.get_context('spawn')
+    job_queue = ctx.Queue()
+    result_queue = ctx.SimpleQueue()
+    for index, job in enumerate(jobs):
+        job_queue.put((index, job))
+
+    results = [None] * len(jobs)
+    errors = {}
+    attempts = {}
+    failed_starts = []
+    pending = set(range(len(jobs)))
+    pool = []
+
+    def start():
+        current = ctx.Value('i', STARTING, lock=False)
+        since = ctx.Value('d', time.time(), lock=False)
+        pid = ctx.Value('i', 0, lock=False)
+        process = ctx.Process(
+            target=_worker,
+            args=(task, backend, job_queue, result_queue, current, since, pid),
+            daemon=True)
+        process.start()
+        pool.append({'process': process, 'current': current, 'since': since,
+                     'pid': pid})
+
+    def replace(worker, reason):
+        pool.remove(worker)
+        worker['process'].terminate()
+        worker['process'].join()
+        _kill(worker['pid'].value)
+        index = worker['current'].value
+        if index == STARTING:
+            failed_starts.append(reason)
+            if len(failed_starts) > workers + retries:
+                for index in pending:
+                    errors[index] = 'unable to start session: ' + reason
+                pending.clear()
+        elif index in pending:
+            attempts[index] = attempts.get(index, 0) + 1
+            if attempts[index] > retries:
+                errors[index] = reason
+                pending.discard(index)
+            else:
+                job_queue.put((index, jobs[index]))
+        print('Worker {} restarted: {}'.format(worker['process'].pid, reason))
+        if pending:
+            start()
+
+    for _ in range(min(workers, len(jobs))):
+        start()
+
+    while pending:
+        if result_queue.empty():
+            time.sleep(0.05)
+        else:
+            index, ok, value = result_queue.get()
+            if index in pending:
+                if ok:
+                    results[index] = value
+                    if on_result is not None:
+                        on_result(index, value)
+                else:
+                    errors[index] = value
+                pending.discard(index)
+
+        # health checks
+        now = time.time()
+        for worker in list(pool):
+            state = worker['current'].value
+            if not worker['process'].is_alive():
+                replace(worker, 'worker exited')
+            elif state != IDLE and now - worker['since'].value > timeout:
+                replace(worker, 'timed out after {} seconds'.format(timeout))
+
+    for _ in pool:
+        job_queue.put(None)
+    for worker in pool:
+        worker['process'].join(timeout)
+        if worker['process'].is_alive():
+            worker['process'].terminate()
+    return results, errors
@@ -0,0 +1,176 @@
+"""
+Print Sets
+
+Merge the single drawing pdfs in each 'print/<size>' folder of an
+exported assembly into print sets, in part list order, so the print room
+gets a few jobs instead of hundreds. pypdf is imported only when a set is
+built, and print sets are skipped without it.
+"""
+
+import system
+import store
+
+import json
+import os
+
+
+# drawings per print set volume, bounds the memory used to merge one
+VOLUME_SIZE = 200
+
+
+def order(assembly):
+    """Partcodes in print order
+
+    The assembly first, then its parts in format matrix order, which
+    follows the part list and bom.
+
+    Parameters
+    ----------
+    assembly : str
+        AGR part number usually in 'AGR0000-000-00' format
+
+    Returns
+    -------
+    partcodes : :obj:`list` of :obj:`str`
+    """
+    directory = system.EXPORT_DIR.joinpath(assembly)
+    if store.find(directory, 'format_type') is None:
+        return [assembly]
+    df = store.read(directory, 'format_type')
+    return list(dict.fromkeys([assembly, *(str(p) for p in df['partcode'])]))
+
+
+def _inputs(folder, partcodes):
+    """Drawing pdfs in a size folder, in print order
+
+    Files that are not in the part list go last, sorted by name.
+    """
+    names = {name for name in os.listdir(str(folder))
+             if name.lower().endswith('.pdf')}
+    ordered = [p + '.pdf' for p in partcodes if p + '.pdf' in names]
+    ordered += sorted(names.difference(ordered))
+    return [folder.joinpath(name) for name in ordered]
+
+
+def _signature(paths):
+    """:obj:`list`: name, mtime and size of each file, to spot changes"""
+    signature = []
+    for path in paths:
+        stat = os.stat(str(path))
+        signature.append([path.name, stat.st_mtime, stat.st_size])
+    return signature
+
+
+def _volume_name(size, number, count):
+    """str: 'A0.pdf' for a single volume, 'A0-1.pdf', 'A0-2.pdf'... otherwise"""
+    if count == 1:
+        return size + '.pdf'
+    return '{}-{}.pdf'.format(size, number)
+
+
+def merge(paths, output):
+    """Merge pdfs into one file
+
+    Each source is opened, its pages added and the result written to a
+    temporary file that replaces 'output', so a failed merge never leaves
+    a partial print set.
+
+    Parameters
+    ----------
+    paths : :obj:`list` of obj
+        Path objects of the pdfs, in order
+    output : obj
+        Path object of the merged pdf
+    """
+    from pypdf import PdfReader, PdfWriter
+    writer = PdfWriter()
+    files = []
+    tmp = output.with_name(output.name + '.tmp')
+    try:
+        for path in paths:
+            file = open(str(path), 'rb')
+            files.append(file)
+            for page in PdfReader(file).pages:
+                writer.add_page(page)
+        with open(str(tmp), 'wb') as out:
+            writer.write(out)
+    finally:
+        for file in files:
+            file.close()
+    os.replace(str(tmp), str(output))
+
+
+def build(assembly, force=False, volume_size=VOLUME_SIZE):
+    """Build the print sets of an exported assembly
+
+    Each 'print/<size>' folder becomes 'print/<size>.pdf', split into
+    volumes of at most 'volume_size' drawings. Only the volumes whose
+    drawings changed since the last build are merged again. A volume that
+    fails to merge is reported and tried again on the next build.
+
+    Parameters
+    ----------
+    assembly : str
+        AGR part number usually in 'AGR0000-000-00' format
+    force : bool
+        merge every volume, even the unchanged ones
+    volume_size : int
+        drawings per volume
+
+    Returns
+    -------
+    built : :obj:`list` of obj
+        Path objects of the volumes merged
+    """
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        print('pypdf is not installed, print sets skipped')
+        return []
+
+    directory = system.EXPORT_DIR.joinpath(assembly).joinpath('print')
+    if not directory.is_dir():
+        return []
+    state_path = directory.joinpath('print_sets.json')
+    try:
+        with open(str(state_path)) as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        state = {}
+
+    partcodes = order(assembly)
+    built = []
+    for folder in sorted(p for p in directory.iterdir() if p.is_dir()):
+        size = folder.name
+        inputs = _inputs(folder, partcodes)
+        chunks = [inputs[i:i + volume_size]
+                  for i in range(0, len(inputs), volume_size)]
+        old = state.get(size, {})
+        new = {}
+        for number, chunk in enumerate(chunks, 1):
+            name = _volume_name(size, number, len(chunks))
+            output = directory.joinpath(name)
+            signature = _signature(chunk)
+            if not force and old.get(name) == signature and output.exists():
+                new[name] = signature
+                continue
+            try:
+                merge(chunk, output)
+            except Exception as e:
+                print('Unable to merge ' + str(output) + ': ' + repr(e))
+                new[name] = None
+                continue
+            new[name] = signature
+            built.append(output)
+        for name in set(old).difference(new):
+            try:
+                os.remove(str(directory.joinpath(name)))
+            except OSError:
+                pass
+        state[size] = new
+
+    tmp = state_path.with_suffix('.tmp')
+    with open(str(tmp), 'w') as file:
+        json.dump(state, file)
+    os.replace(str(tmp), str(state_path))
+    return built
@@ -0,0 +1,250 @@
+"""
+Local Staging Cache
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from pathlib import Path
+
+import threading
+import shutil
+import json
+import os
+
+
+class StagingCache:
+    """Local Staging Cache
+
+    Local copies of workspace files, kept under 'cache_dir' in the same
+    'client/project/section' layout as the workspace, so references
+    between files of a section still resolve. A copy is fresh while the
+    workspace file's mtime and size are unchanged. The least recently used
+    copies are removed once the cache grows past 'max_bytes'.
+
+    Parameters
+    ----------
+    root : obj
+        Path object of the workspace directory (INVENTOR_DIR)
+    cache_dir : obj
+        Path object of the local cache directory
+    max_bytes : int
+        size cap of the cache
+
+    Attributes
+    ----------
+    root : obj
+        Path object of the workspace directory
+    cache_dir : obj
+        Path object of the local cache directory
+    max_bytes : int
+        size cap of the cache
+    entries : obj
+        OrderedDict of relative path -> {'mtime', 'size'} of the workspace
+        file each copy was made from, least recently used first
+    """
+
+    def __init__(self, root, cache_dir, max_bytes):
+        self.root = Path(root)
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        """obj: Path object of the json file the cache state is saved to"""
+        return self.cache_dir.joinpath('staging.json')
+
+    def load(self):
+        """Load the cache state, dropping copies that no longer exist
+
+        Returns
+        -------
+        StagingCache : obj
+            self
+        """
+        try:
+            with open(str(self.path)) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            entries = []
+        self.entries = OrderedDict(
+            (rel, {'mtime': mtime, 'size': size})
+            for rel, mtime, size in entries
+            if self.cache_dir.joinpath(rel).exists())
+        return self
+
+    def save(self):
+        """Save the cache state, least recently used first"""
+        with self._lock:
+            entries = [[rel, e['mtime'], e['size']]
+                       for rel, e in self.entries.items()]
+        os.makedirs(str(self.cache_dir), exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(str(tmp), 'w') as file:
+            json.dump(entries, file)
+        os.replace(str(tmp), str(self.path))
+
+    def _relative(self, path):
+        """str: path relative to the workspace, None if outside it"""
+        try:
+            return Path(path).relative_to(self.root).as_posix()
+        except ValueError:
+            return None
+
+    def local(self, path):
+        """Fresh local copy of a workspace file
+
+        Parameters
+        ----------
+        path : obj
+            Path object of the workspace file
+
+        Returns
+        -------
+        Path : obj
+            Path object of the local copy, or None if it has not been
+            staged or the workspace file has changed since
+        """
+        rel = self._relative(path)
+        if rel is None or rel not in self.entries:
+            return None
+        try:
+            stat = os.stat(str(path))
+        except OSError:
+            return None
+        entry = self.entries[rel]
+        local = self.cache_dir.joinpath(rel)
+        if (entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size
+                or not local.exists()):
+            return None
+        with self._lock:
+            if rel in self.entries:
+                self.entries.move_to_end(rel)
+        return local
+
+    def stage(self, path, keep=()):
+        """Copy a workspace file into the cache, unless it is fresh
+
+        Parameters
+        ----------
+        path : obj
+            Path object of the workspace file
+        keep : :obj:`set` of obj
+            Path objects of workspace files that must not be evicted
+
+        Returns
+        -------
+        Path : obj
+            Path object of the local copy, or the workspace file itself if
+            it is outside the workspace
+        """
+        local = self.local(path)
+        if local is not None:
+            return local
+        rel = self._relative(path)
+        if rel is None:
+            return Path(path)
+
+        stat = os.stat(str(path))
+        local = self.cache_dir.joinpath(rel)
+        os.makedirs(str(local.parent), exist_ok=True)
+        tmp = local.with_name(local.name + '.tmp')
+        shutil.copyfile(str(path), str(tmp))
+        os.replace(str(tmp), str(local))
+
+        with self._lock:
+            self.entries[rel] = {'mtime': stat.st_mtime, 'size': stat.st_size}
+            self.entries.move_to_end(rel)
+            self._evict({self._relative(p) for p in keep} | {rel})
+        return local
+
+    def _evict(self, keep):
+        """Remove least recently used copies until under the size cap"""
+        total = sum(entry['size'] for entry in self.entries.values())
+        for rel in list(self.entries):
+            if total <= self.max_bytes:
+                break
+            if rel in keep:
+                continue
+            try:
+                os.remove(str(self.cache_dir.joinpath(rel)))
+            except OSError:
+                pass
+            total -= self.entries.pop(rel)['size']
+
+
+class Prefetcher:
+    """Stage documents a few places ahead of the exporter
+
+    Each group is a document followed by the files it references. While
+    document 'i' is open, the groups up to 'i + ahead' are copied in a
+    background thread.
+
+    Parameters
+    ----------
+    cache : obj
+        StagingCache, or None to always open from the workspace
+    groups : :obj:`list` of :obj:`list` of obj
+        Path objects of each document and the files it references
+    ahead : int
+        number of documents staged ahead of the one being opened
+    """
+
+    def __init__(self, cache, groups, ahead=2):
+        self.cache = cache
+        self.groups = groups
+        self.ahead = ahead
+        self._futures = {}
+        self._keep = set()
+        self._executor = None
+        if cache is not None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _stage(self, group):
+        return [self.cache.stage(path, self._keep) for path in group][0]
+
+    def open(self, i):
+        """Path to open document 'i' from
+
+        Parameters
+        ----------
+        i : int
+            position of the document in 'groups'
+
+        Returns
+        -------
+        Path : obj
+            Path object of the local copy, or of the workspace file if
+            staging is off or the copy failed
+        """
+        if self._executor is None:
+            return self.groups[i][0]
+        upcoming = range(i, min(i + self.ahead + 1, len(self.groups)))
+        self._keep = {path for j in upcoming for path in self.groups[j]}
+        for j in upcoming:
+            if j not in self._futures:
+                self._futures[j] = self._executor.submit(
+                    self._stage, self.groups[j])
+        try:
+            return self._futures.pop(i).result()
+        except OSError as e:
+            print('Unable to stage ' + str(self.groups[i][0]) + ': ' + repr(e))
+            return self.groups[i][0]
+
+    def close(self):
+        """Stop staging and save the cache state"""
+        if self._executor is None:
+            return
+        for future in self._futures.values():
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self.cache.save()
@@ -0,0 +1,123 @@
+"""
+Intermediate Tables
+
+Tables passed between the pipeline stages (part list, bom, format matrix,
+drawing info) are saved as Parquet when pyarrow is installed and as CSV
+otherwise. Excel is only written for the final report.
+"""
+
+import timing
+
+import os
+
+
+# columns read as text, so values like '007' keep their leading zeros
+TEXT_COLUMNS = ('partcode', 'desc', 'material', 'finish', 'size',
+                'Dwg_No', 'Part Number')
+
+# Inventor writes csv part lists and boms in the Windows ANSI code page
+INVENTOR_ENCODING = 'cp1252'
+
+
+def table_format():
+    """str: 'parquet' if pyarrow can be imported, otherwise 'csv'"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'csv'
+    return 'parquet'
+
+
+def find(directory, name):
+    """Find a saved table
+
+    Parameters
+    ----------
+    directory : obj
+        Path object of the folder the table is saved in
+    name : str
+        table name without extension, e.g. 'bom'
+
+    Returns
+    -------
+    Path : obj
+        Path object of the table, or None if it has not been saved. Tables
+        left as xlsx by older runs are still found.
+    """
+    for ext in ('parquet', 'csv', 'xlsx'):
+        path = directory.joinpath(name + '.' + ext)
+        if os.path.exists(str(path)):
+            return path
+    return None
+
+
+def read(directory, name, encoding=None):
+    """Read a saved table
+
+    Only empty cells are read as missing. pandas would otherwise turn
+    iProperty values such as 'None', 'NA' or 'N/A' into NaN.
+
+    Parameters
+    ----------
+    directory : obj
+        Path object of the folder the table is saved in
+    name : str
+        table name without extension, e.g. 'bom'
+    encoding : str
+        encoding of a csv table, utf-8 if not given. Tables exported by
+        Inventor are ANSI, see INVENTOR_ENCODING.
+
+    Returns
+    -------
+    DataFrame : obj
+        pandas DataFrame
+    """
+    import pandas as pd
+    path = find(directory, name)
+    if path is None:
+        raise FileNotFoundError(str(directory.joinpath(name)))
+    with timing.stage('store.read'):
+        if path.suffix == '.parquet':
+            return pd.read_parquet(str(path))
+        options = {
+            'keep_default_na': False,
+            'na_values': [''],
+            'dtype': {column: str for column in TEXT_COLUMNS},
+        }
+        if path.suffix == '.csv':
+            return pd.read_csv(str(path), encoding=encoding, **options)
+        return pd.read_excel(str(path), **options)
+
+
+def write(df, directory, name):
+    """Save a table in the intermediate format
+
+    Any copy of the table saved in another format is removed, so 'read'
+    never picks up a stale one.
+
+    Parameters
+    ----------
+    df : obj
+        pandas DataFrame
+    directory : obj
+        Path object of the folder to save in
+    name : str
+        table name without extension, e.g. 'format_type'
+
+    Returns
+    -------
+    Path : obj
+        Path object of the saved table
+    """
+    fmt = table_format()
+    path = directory.joinpath(name + '.' + fmt)
+    with timing.stage('store.write'):
+        if fmt == 'parquet':
+            df.to_parquet(str(path), index=False)
+        else:
+            df.to_csv(str(path), index=False)
+    for ext in ('parquet', 'csv'):
+        other = directory.joinpath(name + '.' + ext)
+        if ext != fmt and os.path.exists(str(other)):
+            os.remove(str(other))
+    return path
@@ -2,10 +2,14 @@
 Operating System Methods
 """
 
+import timing
+from index import PartIndex, FILETYPES
+from manifest import file_hash
+from staging import StagingCache
 from pathlib import Path
-from glob import glob
 
 import subprocess
+import shutil
 import time
 import os
 
@@ -13,6 +17,16 @@ import os
 EXPORT_DIR = Path('C:/Users/GARY/Desktop/CAD/')
 INVENTOR_DIR = Path('D:/BC-Workspace/GARY/M-Balmoral,D-AGR/Projects')
 INVENTOR_APP = Path('C:/Program Files/Autodesk/Inventor 2016/Bin/Inventor.exe')
+INDEX_PATH = EXPORT_DIR.joinpath('partcode_index.json')
+INFO_CACHE_PATH = EXPORT_DIR.joinpath('drawing_info_cache.json')
+QUEUE_PATH = EXPORT_DIR.joinpath('jobs.sqlite')
+STAGING_DIR = Path('C:/CAD_staging/')
+STAGING_MAX_BYTES = 20 * 2**30
+CNC_DIR = Path('G:/')
+
+_index = None
+_staging = None
+_inventor_alive = False
 
 
 def create_project(partcode):
@@ -26,15 +40,100 @@ def create_project(partcode):
     directory = str(EXPORT_DIR.joinpath(partcode))
     if not os.path.exists(directory):
         os.makedirs(directory)
-        os.makedirs(directory + r'\print\A0')
-        os.makedirs(directory + r'\print\A1')
-        os.makedirs(directory + r'\print\A3')
-        os.makedirs(directory + r'\pdf')
-        os.makedirs(directory + r'\from_autocad')
-        # os.makedirs(directory + r'\dxf')
+        os.makedirs(directory + '/print/A0')
+        os.makedirs(directory + '/print/A1')
+        os.makedirs(directory + '/print/A3')
+        os.makedirs(directory + '/pdf')
+        os.makedirs(directory + '/from_autocad')
+        # os.makedirs(directory + '/dxf')
         # os.makedirs(directory + '\dwg')
 
 
+def get_index():
+    """Partcode file index
+
+    Load the persistent index on first use and refresh it once, so every
+    later lookup in this session is a dictionary access.
+
+    Returns
+    -------
+    PartIndex : obj
+        Partcode file index from index.py
+    """
+    global _index
+    if _index is None:
+        _index = PartIndex(INVENTOR_DIR, INDEX_PATH)
+        _index.load()
+        refresh_index()
+    return _index
+
+
+def refresh_index(partcodes=()):
+    """Refresh the partcode file index and save it
+
+    Parameters
+    ----------
+    partcodes : :obj:`iterable` of :obj:`str`
+        partcodes whose files are also checked for changes in place, see
+        PartIndex.refresh
+
+    Returns
+    -------
+    changed : :obj:`set` of :obj:`str`
+        partcodes that were added, removed or modified
+    """
+    index = _index if _index is not None else get_index()
+    with timing.stage('index.refresh'):
+        changed = index.refresh(partcodes)
+    index.save()
+    return changed
+
+
+def rebuild_index():
+    """Rebuild the partcode file index from scratch and save it
+
+    Returns
+    -------
+    changed : :obj:`set` of :obj:`str`
+        partcodes that were added, removed or modified
+    """
+    index = get_index()
+    changed = index.rebuild()
+    index.save()
+    return changed
+
+
+def index_conflicts():
+    """Duplicate partcodes in the workspace
+
+    Returns
+    -------
+    conflicts : dict
+        (partcode, filetype) -> list of Path objects
+    """
+    return get_index().conflicts()
+
+
+def get_staging():
+    """Local staging cache
+
+    Loaded on first use. Set STAGING_DIR to None to open every file from
+    the workspace.
+
+    Returns
+    -------
+    StagingCache : obj
+        Local staging cache from staging.py, None if staging is off
+    """
+    global _staging
+    if STAGING_DIR is None:
+        return None
+    if _staging is None:
+        _staging = StagingCache(
+            INVENTOR_DIR, STAGING_DIR, STAGING_MAX_BYTES).load()
+    return _staging
+
+
 def find_path(partcode, filetype):
     """find Inventor file path
 
@@ -50,20 +149,17 @@ def find_path(partcode, filetype):
     Path : obj
         Path object from Python pathlib module
     """
-    client = '*'
-    project = partcode[0:7]
-    section = partcode[8:11]
-    file = partcode + '.' + filetype
-    paths = glob(str(INVENTOR_DIR / client / project / section / file))
-
-    # if len(paths) == 0:
-    #     paths = glob(str(INVENTOR_DIR / '**' / file), recursive=True)
+    with timing.stage('find_path', partcode):
+        paths = get_index().lookup(partcode, filetype)
+
     if len(paths) == 0:
         print('Unable to find ' + partcode)
     if len(paths) > 1:
         print('Warning - multiple files found. Use first path in list')
+        for path in paths:
+            print('    ' + str(path))
     if len(paths) > 0:
-        return Path(paths[0])
+        return paths[0]
 
 
 def find_paths(partcodes, filetype):
@@ -89,14 +185,171 @@ def find_paths(partcodes, filetype):
     return paths
 
 
-def start_inventor():
+def find_formats(partcodes, filetypes=FILETYPES):
+    """find available file formats
+
+    Answered from the partcode file index, the same source as
+    'find_path', so the format matrix never lists a file 'find_path'
+    cannot resolve or misses one it can.
+
+    Parameters
+    ----------
+    partcodes : :obj:`list` of :obj:`str`
+        AGR part numbers usually in 'AGR0000-000-00' format
+    filetypes : :obj:`tuple` of :obj:`str`
+        file types to look for
+
+    Returns
+    -------
+    formats : dict
+        partcode -> set of file types found for that partcode
+    """
+    index = get_index()
+    return {
+        partcode: {filetype for filetype in filetypes
+                   if index.lookup(partcode, filetype)}
+        for partcode in partcodes
+    }
+
+
+def fan_out(source, destinations):
+    """Place an exported file in more than one folder
+
+    Hardlink the file into each destination folder, or copy it when the
+    filesystem does not support hardlinks (e.g. across drives). Any file
+    already at a destination is replaced.
+
+    Parameters
+    ----------
+    source : obj
+        Path object of the exported file
+    destinations : :obj:`list` of obj
+        Path objects of the destination files
+
+    Returns
+    -------
+    Path : :obj:`list` of obj
+        Path objects of the destination files
+    """
+    for destination in destinations:
+        os.makedirs(str(destination.parent), exist_ok=True)
+        if os.path.lexists(str(destination)):
+            os.remove(str(destination))
+        try:
+            os.link(str(source), str(destination))
+        except OSError:
+            shutil.copyfile(str(source), str(destination))
+    return list(destinations)
+
+
+def transfer(source, directory):
+    """Move an exported file to another drive, verified
+
+    The file is copied to a temporary name in the destination folder,
+    checked against the source's sha1 and renamed into place, so the
+    destination never holds a partial file. A destination file identical
+    to the source is left alone. The source is removed once it is safely
+    in the destination.
+
+    Parameters
+    ----------
+    source : obj
+        Path object of the exported file
+    directory : obj
+        Path object of the destination folder, e.g. CNC_DIR
+
+    Returns
+    -------
+    bool
+        True if the file was copied, False if it was already there
+    """
+    destination = Path(directory).joinpath(Path(source).name)
+    digest = file_hash(source)
+    if (destination.exists()
+            and destination.stat().st_size == os.stat(str(source)).st_size
+            and file_hash(destination) == digest):
+        os.remove(str(source))
+        return False
+
+    tmp = destination.with_name(destination.name + '.tmp')
+    shutil.copyfile(str(source), str(tmp))
+    if file_hash(tmp) != digest:
+        os.remove(str(tmp))
+        raise OSError('Checksum mismatch copying ' + str(source))
+    os.replace(str(tmp), str(destination))
+    os.remove(str(source))
+    return True
+
+
+def _tasklist():
+    """str: running process table"""
+    return os.popen("tasklist").read()
+
+
+def is_inventor_running():
+    """bool: is there an Inventor process?"""
+    return 'Inventor.exe' in _tasklist()
+
+
+def wait_for_inventor(ready=is_inventor_running, timeout=60, interval=0.5):
+    """Wait until Inventor is ready
+
+    Poll instead of sleeping for a fixed time after starting Inventor.
+
+    Parameters
+    ----------
+    ready : function
+        returns True once Inventor can be used. Defaults to checking the
+        process table.
+    timeout : float
+        seconds to wait before giving up
+    interval : float
+        seconds between polls
+
+    Returns
+    -------
+    bool
+        True if Inventor became ready within the timeout
+    """
+    deadline = time.time() + timeout
+    while not ready():
+        if time.time() > deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+
+def start_inventor(ready=is_inventor_running):
     """Open Inventor
 
     Inventer must be active for the COM API to work.
+    The process table is only checked on the first call, later calls return
+    straight away until 'inventor_failed()' reports a failed COM call.
+
+    Parameters
+    ----------
+    ready : function
+        passed on to 'wait_for_inventor' when Inventor has to be started
     """
-    if 'Inventor.exe' not in os.popen("tasklist").read():
+    global _inventor_alive
+    if _inventor_alive:
+        return
+    if not is_inventor_running():
         subprocess.Popen(INVENTOR_APP)
-        time.sleep(10)
+        if not wait_for_inventor(ready):
+            print('Warning - Inventor is not responding')
+            return
+    _inventor_alive = True
+
+
+def inventor_failed():
+    """Forget that Inventor is alive
+
+    Call after a COM call fails, so the next 'start_inventor()' checks the
+    process table again.
+    """
+    global _inventor_alive
+    _inventor_alive = False
 
 
 if __name__ == '__main__':
@@ -104,3 +357,4 @@ if __name__ == '__main__':
     # start_inventor()
     # create_project('Hello')
     # print(find_paths(['AGR1316-010-00', 'AGR1316-020-00'], 'iam'))
+    # print(index_conflicts())
@@ -0,0 +1,146 @@
+"""
+AutoCAD Batch Export Tests
+
+Run against fake command sinks, so they need neither AutoCAD nor
+win32com.
+"""
+
+from pathlib import Path
+
+import autocad
+import fake_autocad
+import fake
+
+import pytest
+
+import re
+import threading
+import time
+
+
+@pytest.fixture(autouse=True)
+def no_latency(monkeypatch):
+    monkeypatch.setattr(fake, 'OPEN_LATENCY', 0.0)
+    monkeypatch.setattr(fake, 'EXPORT_LATENCY', 0.0)
+
+
+def _dwgs(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path.joinpath('ws', 'AGR9000-000-{:02d}.dwg'.format(i))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('dwg')
+        paths.append(path)
+    return paths
+
+
+class SkippingSink(fake_autocad.ScriptSink):
+    """Fake sink that runs the script but fails to export some drawings"""
+
+    def __init__(self, skip):
+        super().__init__()
+        self.skip = skip
+
+    def __call__(self, script):
+        lines = script.splitlines(keepends=True)
+        kept = [line for line in lines
+                if not any(name in line for name in self.skip)]
+        super().__call__(''.join(kept))
+
+
+class FakeDocument:
+    def __init__(self):
+        self.commands = []
+
+    def SendCommand(self, command):
+        self.commands.append(command)
+
+
+class FakeApp:
+    def __init__(self):
+        self.ActiveDocument = FakeDocument()
+
+
+def test_export_script_opens_each_drawing_once():
+    paths = [Path('a.dwg'), Path('b.dwg')]
+    outputs = [Path('out/a.pdf'), Path('out/b.pdf')]
+    script = autocad.export_script(paths, outputs)
+    assert script.startswith('FILEDIA 0\nSDI 1\n')
+    assert script.endswith('SDI 0\nFILEDIA 1\n')
+    assert script.count('(command "_.OPEN" "_N" ') == 2
+    assert script.count('-EXPORT PDF') == 2
+    assert script.index('a.dwg') < script.index('a.pdf') < script.index('b.dwg')
+
+
+def test_export_script_paths_are_lisp_safe():
+    script = autocad.export_script([Path('C:/ws/a.dwg')], [Path('a.pdf')])
+    open_line = script.splitlines()[2]
+    assert '\\' not in open_line
+    assert '"C:/ws/a.dwg"' in open_line
+
+
+class SlowSink:
+    """Fake sink that writes the outputs in the background, one every
+    `interval` seconds, the way AutoCAD works through a long script"""
+
+    def __init__(self, interval):
+        self.interval = interval
+
+    def __call__(self, script):
+        outputs = re.findall(r'-EXPORT PDF E NO "([^"]+)"', script)
+
+        def write():
+            for output in outputs:
+                time.sleep(self.interval)
+                Path(output).write_bytes(fake.pdf(output))
+        threading.Thread(target=write, daemon=True).start()
+
+
+def test_batch_export_runs_one_script(tmp_path):
+    paths = _dwgs(tmp_path, 3)
+    sink = fake_autocad.ScriptSink()
+    outputs, missing = autocad.batch_export(
+        paths, 'AGR9000-000-00/from_autocad', export_dir=tmp_path,
+        sink=sink, timeout=0)
+    assert len(sink.scripts) == 1
+    assert missing == []
+    assert [output.stem for output in outputs] == [p.stem for p in paths]
+    assert all(output.exists() for output in outputs)
+
+
+def test_batch_export_reports_missing_outputs(tmp_path):
+    paths = _dwgs(tmp_path, 3)
+    sink = SkippingSink([paths[1].stem + '.pdf'])
+    outputs, missing = autocad.batch_export(
+        paths, 'from_autocad', export_dir=tmp_path, sink=sink, timeout=0)
+    assert missing == [outputs[1]]
+
+
+def test_batch_export_ignores_outputs_of_an_earlier_run(tmp_path):
+    paths = _dwgs(tmp_path, 2)
+    autocad.batch_export(paths, 'from_autocad', export_dir=tmp_path,
+                         sink=fake_autocad.ScriptSink(), timeout=0)
+    sink = SkippingSink([p.stem + '.pdf' for p in paths])
+    outputs, missing = autocad.batch_export(
+        paths, 'from_autocad', export_dir=tmp_path, sink=sink, timeout=0)
+    assert missing == outputs
+
+
+def test_batch_export_waits_while_outputs_keep_appearing(tmp_path):
+    paths = _dwgs(tmp_path, 3)
+    tmp_path.joinpath('from_autocad').mkdir()
+    outputs, missing = autocad.batch_export(
+        paths, 'from_autocad', export_dir=tmp_path, sink=SlowSink(0.8),
+        timeout=1.5)
+    assert missing == []
+
+
+def test_script_sink_removes_its_script(tmp_path):
+    app = FakeApp()
+    paths = _dwgs(tmp_path, 1)
+    autocad.batch_export(paths, 'from_autocad', app, export_dir=tmp_path,
+                         timeout=0)
+    command, = app.ActiveDocument.commands
+    assert command.startswith('_.SCRIPT "')
+    script = command[len('_.SCRIPT "'):].rstrip('"\n')
+    assert not Path(script).exists()
@@ -0,0 +1,81 @@
+"""
+BOM Walker Tests
+
+Walk in-memory assembly trees, so they need neither Inventor nor any
+exported part lists.
+"""
+
+import bom
+
+
+TREE = {
+    'AGR0000-000-00': ['AGR0000-100-00', 'AGR0000-200-00', 'AGR0000-000-01'],
+    'AGR0000-100-00': ['AGR0000-100-01', 'AGR0000-300-00'],
+    'AGR0000-200-00': ['AGR0000-300-00', 'AGR0000-000-01'],
+    'AGR0000-300-00': ['AGR0000-300-01'],
+}
+
+
+class Children:
+    """children function over a dict tree that counts its calls"""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.calls = []
+
+    def __call__(self, assembly):
+        self.calls.append(assembly)
+        return self.tree.get(assembly, [])
+
+
+def is_assembly(partcode):
+    return partcode.endswith('-00')
+
+
+def test_every_partcode_appears_once():
+    order = bom.walk('AGR0000-000-00', Children(TREE), is_assembly)
+    assert sorted(order) == sorted(
+        {child for children in TREE.values() for child in children})
+    assert len(order) == len(set(order))
+    assert 'AGR0000-000-00' not in order
+
+
+def test_children_come_before_their_parents():
+    order = bom.walk('AGR0000-000-00', Children(TREE), is_assembly)
+    for assembly, children in TREE.items():
+        if assembly == 'AGR0000-000-00':
+            continue
+        for child in children:
+            assert order.index(child) < order.index(assembly)
+
+
+def test_shared_sub_assembly_is_expanded_once():
+    children = Children(TREE)
+    bom.walk('AGR0000-000-00', children, is_assembly)
+    assert children.calls.count('AGR0000-300-00') == 1
+
+
+def test_memo_is_reused_between_walks():
+    children = Children(TREE)
+    memo = {}
+    bom.walk('AGR0000-100-00', children, is_assembly, memo)
+    bom.walk('AGR0000-200-00', children, is_assembly, memo)
+    assert sorted(children.calls) == sorted(
+        ['AGR0000-100-00', 'AGR0000-200-00', 'AGR0000-300-00'])
+    assert memo['AGR0000-300-00'] == ['AGR0000-300-01']
+
+
+def test_parts_are_not_expanded():
+    children = Children(TREE)
+    bom.walk('AGR0000-000-00', children, is_assembly)
+    assert not any(call.endswith('-01') for call in children.calls)
+
+
+def test_assembly_containing_itself_is_skipped_with_a_warning(capsys):
+    tree = {
+        'AGR0000-000-00': ['AGR0000-100-00'],
+        'AGR0000-100-00': ['AGR0000-100-01', 'AGR0000-000-00'],
+    }
+    order = bom.walk('AGR0000-000-00', Children(tree), is_assembly)
+    assert order == ['AGR0000-100-01', 'AGR0000-100-00']
+    assert 'AGR0000-000-00 contains itself' in capsys.readouterr().out
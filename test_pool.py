@@ -0,0 +1,103 @@
+"""
+Worker Pool Tests
+
+Run the pool on the fake backend. The tasks are module level so the
+spawned workers can import them.
+"""
+
+from pathlib import Path
+
+import backend
+import pool
+
+import os
+import time
+
+
+# backend whose session never starts, registered at import so the
+# spawned workers see it too
+backend.BACKENDS['broken'] = ('test_pool', 'fake_autocad')
+
+
+def application(silent=True, visible=True, new_instance=False):
+    raise RuntimeError('no licence')
+
+
+def process_id(app):
+    return None
+
+
+def task(job, app, module):
+    """Run one test job: ('ok', value), ('raise',), ('crash',), ('hang',)
+    or ('hang_once', marker file)"""
+    kind = job[0]
+    if kind == 'raise':
+        raise ValueError('bad drawing')
+    if kind == 'crash':
+        os._exit(1)
+    if kind == 'hang':
+        time.sleep(600)
+    if kind == 'hang_once':
+        marker = Path(job[1])
+        if not marker.exists():
+            marker.write_text('hung')
+            time.sleep(600)
+        return 'recovered'
+    return job[1]
+
+
+def test_results_in_job_order():
+    jobs = [('ok', i) for i in range(6)]
+    results, errors = pool.run(task, jobs, workers=2, backend='fake')
+    assert results == list(range(6))
+    assert errors == {}
+
+
+def test_on_result_called_for_each_success():
+    seen = {}
+    results, errors = pool.run(
+        task, [('ok', 'a'), ('raise',), ('ok', 'b')], workers=1,
+        backend='fake', on_result=seen.__setitem__)
+    assert seen == {0: 'a', 2: 'b'}
+
+
+def test_exception_is_reported_and_the_rest_run():
+    results, errors = pool.run(
+        task, [('ok', 1), ('raise',), ('ok', 3)], workers=1, backend='fake')
+    assert results == [1, None, 3]
+    assert list(errors) == [1]
+    assert 'bad drawing' in errors[1]
+
+
+def test_crashed_worker_is_replaced():
+    results, errors = pool.run(
+        task, [('ok', 1), ('crash',), ('ok', 3)], workers=1,
+        backend='fake', retries=1)
+    assert results == [1, None, 3]
+    assert errors == {1: 'worker exited'}
+
+
+def test_hung_job_times_out_and_the_rest_run():
+    results, errors = pool.run(
+        task, [('hang',), ('ok', 2)], workers=1, backend='fake',
+        timeout=3, retries=0)
+    assert results == [None, 2]
+    assert errors == {0: 'timed out after 3 seconds'}
+
+
+def test_hung_job_is_requeued(tmp_path):
+    marker = str(tmp_path.joinpath('hung'))
+    results, errors = pool.run(
+        task, [('hang_once', marker), ('ok', 2)], workers=1,
+        backend='fake', timeout=3, retries=1)
+    assert results == ['recovered', 2]
+    assert errors == {}
+
+
+def test_session_that_never_starts_fails_every_job():
+    results, errors = pool.run(
+        task, [('ok', 1), ('ok', 2)], workers=1, backend='broken',
+        retries=1)
+    assert results == [None, None]
+    assert sorted(errors) == [0, 1]
+    assert all(e.startswith('unable to start session') for e in errors.values())
@@ -0,0 +1,241 @@
+"""
+Stage Timing
+
+Timers and counters around each step of a batch export. Disabled by
+default, when a 'stage' costs one flag check. Enable with 'enable()' or
+the BATCH_TIMING environment variable, then save the run's timings with
+'write_report(path)'.
+"""
+
+from pathlib import Path
+
+import json
+import time
+import csv
+import os
+
+
+ENABLED = os.environ.get('BATCH_TIMING', '') not in ('', '0')
+
+# (stage, partcode, seconds) of every timed stage this run
+RECORDS = []
+# counter name -> count
+COUNTERS = {}
+
+_partcode = None
+
+
+class _Null:
+    """Context manager that does nothing, used while timing is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _Null()
+
+
+class _Stage:
+    """Time one stage and append it to RECORDS on exit"""
+
+    def __init__(self, name, partcode):
+        self.name = name
+        self.partcode = partcode
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        add(self.name, time.perf_counter() - self.start, self.partcode)
+        return False
+
+
+class _Part:
+    """Attribute the stages run inside it to a partcode"""
+
+    def __init__(self, partcode):
+        self.partcode = partcode
+
+    def __enter__(self):
+        global _partcode
+        self.previous, _partcode = _partcode, self.partcode
+        return self
+
+    def __exit__(self, *exc):
+        global _partcode
+        _partcode = self.previous
+        return False
+
+
+def enable(on=True):
+    """Switch timing on or off"""
+    global ENABLED
+    ENABLED = on
+
+
+def reset():
+    """Forget the timings and counters recorded so far"""
+    global _partcode
+    del RECORDS[:]
+    COUNTERS.clear()
+    _partcode = None
+
+
+def stage(name, partcode=None):
+    """Time a stage
+
+    Use as 'with timing.stage("open"):'.
+
+    Parameters
+    ----------
+    name : str
+        stage name
+    partcode : str
+        partcode the stage works on, defaults to the one set by 'part'
+    """
+    if not ENABLED:
+        return _NULL
+    return _Stage(name, partcode)
+
+
+def part(partcode):
+    """Attribute the stages inside the 'with' block to a partcode
+
+    Parameters
+    ----------
+    partcode : str
+        AGR part number usually in 'AGR0000-000-00' format
+    """
+    if not ENABLED:
+        return _NULL
+    return _Part(partcode)
+
+
+def add(name, seconds, partcode=None):
+    """Record a stage timed elsewhere
+
+    Parameters
+    ----------
+    name : str
+        stage name
+    seconds : float
+        time taken
+    partcode : str
+        partcode the stage worked on, defaults to the one set by 'part'
+    """
+    if ENABLED:
+        RECORDS.append((name, partcode or _partcode, seconds))
+
+
+def count(name, n=1):
+    """Add 'n' to a counter"""
+    if ENABLED:
+        COUNTERS[name] = COUNTERS.get(name, 0) + n
+
+
+def percentile(values, q):
+    """Nearest-rank percentile
+
+    Parameters
+    ----------
+    values : :obj:`list` of float
+        sorted values
+    q : float
+        percentile, 0 to 100
+
+    Returns
+    -------
+    float
+        value at the percentile, None if there are no values
+    """
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * q // 100))
+    return values[int(rank) - 1]
+
+
+def summary():
+    """Per-stage statistics of the recorded timings
+
+    Returns
+    -------
+    stages : dict
+        stage -> {'count', 'total', 'mean', 'p50', 'p90', 'p99', 'max'},
+        in order of first use
+    """
+    seconds = {}
+    for name, partcode, t in RECORDS:
+        seconds.setdefault(name, []).append(t)
+    stages = {}
+    for name, values in seconds.items():
+        values.sort()
+        total = sum(values)
+        stages[name] = {
+            'count': len(values),
+            'total': total,
+            'mean': total / len(values),
+            'p50': percentile(values, 50),
+            'p90': percentile(values, 90),
+            'p99': percentile(values, 99),
+            'max': values[-1],
+        }
+    return stages
+
+
+def parts():
+    """Time spent on each partcode
+
+    Returns
+    -------
+    parts : dict
+        partcode -> {stage: total seconds}, in order of first use
+    """
+    rows = {}
+    for name, partcode, t in RECORDS:
+        if partcode is None:
+            continue
+        row = rows.setdefault(partcode, {})
+        row[name] = row.get(name, 0.0) + t
+    return rows
+
+
+def write_report(path):
+    """Save the run's timing report
+
+    Writes '<path>.json' with the per-stage percentiles, counters and
+    per-partcode timings, and '<path>.csv' with one row per partcode and
+    one column per stage.
+
+    Parameters
+    ----------
+    path : obj
+        Path object of the report, without extension
+
+    Returns
+    -------
+    :obj:`tuple` of obj
+        Path objects of the json and csv files
+    """
+    path = Path(path)
+    os.makedirs(str(path.parent), exist_ok=True)
+    stages = summary()
+    rows = parts()
+
+    json_path = path.with_suffix('.json')
+    with open(str(json_path), 'w') as file:
+        json.dump({'stages': stages, 'counters': COUNTERS, 'parts': rows},
+                  file, indent=2)
+
+    csv_path = path.with_suffix('.csv')
+    with open(str(csv_path), 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['partcode'] + list(stages))
+        for partcode, row in rows.items():
+            writer.writerow(
+                [partcode] + ['{:.6f}'.format(row[name]) if name in row else ''
+                              for name in stages])
+    return json_path, csv_path
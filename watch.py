@@ -0,0 +1,200 @@
+"""
+Watch Mode
+
+Poll the workspace and re-export the drawings that change, so the
+exported assemblies under EXPORT_DIR stay current.
+"""
+
+import system
+import store
+import core
+import printset
+import backend as backends
+
+import time
+
+
+class Watcher:
+    """Workspace Watcher
+
+    Each poll refreshes the partcode index, which only re-lists the
+    section folders whose mtime has changed, and stats the files of the
+    partcodes the exported assemblies use, so polling a network share
+    stays cheap. Changes are collected until the workspace has been quiet
+    for 'quiet' seconds, then every exported assembly that uses a changed
+    partcode is brought up to date.
+
+    An assembly counts as exported once it has a format matrix in
+    EXPORT_DIR. Only the changed partcodes are exported again. When the
+    assembly itself changes, or a partcode it lists appears in the
+    workspace, its part list, bom and format matrix are exported again
+    first. The print sets with changed drawings are merged again.
+
+    Parameters
+    ----------
+    app : obj
+        Inventor Application COM Object or backend.Session, started on
+        the first update
+    quiet : float
+        seconds without changes before exporting
+    recursive : bool
+        include the sub-assemblies when a format matrix is rebuilt
+    report : bool
+        save drawing_info.xlsx and format_type.xlsx after each update
+
+    Attributes
+    ----------
+    pending : :obj:`set` of :obj:`str`
+        changed partcodes not exported yet
+    """
+
+    def __init__(self, app, quiet=10.0, recursive=False, report=True):
+        self.app = app
+        self.quiet = quiet
+        self.recursive = recursive
+        self.report = report
+        self.pending = set()
+        self._last_change = 0.0
+        self._matrices = {}
+
+    def _matrix(self, assembly):
+        """Formats of each partcode in an assembly's format matrix
+
+        Re-read only when the saved matrix changes.
+
+        Returns
+        -------
+        formats : dict
+            partcode -> True if any of its files were found, None if the
+            assembly has not been exported
+        """
+        path = store.find(system.EXPORT_DIR.joinpath(assembly), 'format_type')
+        if path is None:
+            return None
+        mtime = path.stat().st_mtime
+        cached = self._matrices.get(assembly)
+        if cached is None or cached[0] != mtime:
+            df = store.read(path.parent, 'format_type')
+            found = df[['ipt', 'iam', 'idw', 'dwg']].any(axis=1)
+            cached = (mtime, dict(zip(df['partcode'], found)))
+            self._matrices[assembly] = cached
+        return cached[1]
+
+    def _exported(self):
+        """Yield (assembly, format matrix) of every exported assembly"""
+        for directory in sorted(system.EXPORT_DIR.iterdir()):
+            if not directory.is_dir():
+                continue
+            matrix = self._matrix(directory.name)
+            if matrix is not None:
+                yield directory.name, matrix
+
+    def watched(self):
+        """:obj:`set` of :obj:`str`: partcodes of the exported assemblies,
+        the assemblies included"""
+        partcodes = set()
+        for assembly, matrix in self._exported():
+            partcodes.update(matrix)
+            partcodes.add(assembly)
+        return partcodes
+
+    def affected(self, changed):
+        """Exported assemblies that use the changed partcodes
+
+        Parameters
+        ----------
+        changed : :obj:`set` of :obj:`str`
+            changed partcodes
+
+        Returns
+        -------
+        affected : dict
+            assembly -> set of its changed partcodes
+        """
+        affected = {}
+        for assembly, matrix in self._exported():
+            hits = changed & (set(matrix) | {assembly})
+            if hits:
+                affected[assembly] = hits
+        return affected
+
+    def update(self, assembly, partcodes):
+        """Export the changed partcodes of one assembly
+
+        Parameters
+        ----------
+        assembly : str
+            AGR part number usually in 'AGR0000-000-00' format
+        partcodes : :obj:`set` of :obj:`str`
+            changed partcodes used in the assembly
+        """
+        app = backends.application(self.app)
+        matrix = self._matrix(assembly)
+        rebuild = assembly in partcodes or any(
+            not matrix.get(partcode, True) for partcode in partcodes)
+        # the index has seen these change, the manifest is not asked
+        if rebuild:
+            core.process_assembly(assembly, app)
+            core.create_format_matrix(assembly, self.recursive, app)
+            core.process_parts(assembly, app, force=partcodes)
+        else:
+            core.process_parts(
+                assembly, app, partcodes=partcodes, force=partcodes)
+        if self.report:
+            core.write_report(assembly)
+        printset.build(assembly)
+
+    def poll(self, now=None):
+        """Check the workspace once, export if it has been quiet long enough
+
+        Returns
+        -------
+        updated : dict
+            assembly -> partcodes exported in this poll
+        """
+        now = time.time() if now is None else now
+        changed = system.refresh_index(self.watched())
+        if changed:
+            self.pending |= changed
+            self._last_change = now
+        if not self.pending or now - self._last_change < self.quiet:
+            return {}
+
+        changed, self.pending = self.pending, set()
+        updated = self.affected(changed)
+        for assembly, partcodes in updated.items():
+            print('Updating {}: {}'.format(assembly, ', '.join(sorted(partcodes))))
+            try:
+                self.update(assembly, partcodes)
+            except Exception as e:
+                print('Unable to update {}: {!r}'.format(assembly, e))
+        return updated
+
+
+def watch(app, interval=5.0, quiet=10.0, recursive=False, report=True):
+    """Main - Watch Workspace
+
+    Poll the workspace every 'interval' seconds until interrupted, see
+    Watcher. Changes made while nothing was watching are not picked up,
+    run a batch export for those.
+
+    Parameters
+    ----------
+    app : obj
+        Inventor Application COM Object or backend.Session, started on
+        the first update
+    interval : float
+        seconds between polls
+    quiet : float
+        seconds without changes before exporting
+    recursive : bool
+        include the sub-assemblies when a format matrix is rebuilt
+    report : bool
+        save drawing_info.xlsx and format_type.xlsx after each update
+    """
+    system.get_index()
+    watcher = Watcher(app, quiet, recursive, report)
+    print('Watching ' + str(system.INVENTOR_DIR))
+    while True:
+        watcher.poll()
+        time.sleep(interval)